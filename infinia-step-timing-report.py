@@ -0,0 +1,195 @@
+#!/usr/bin/env python3
+# pylint: skip-file
+"""
+Step Timing Report Tool
+Aggregates the step_timing_*.jsonl records written by infinia_step_timing.sh
+into per-phase timings and flags regressions between releases (RED_VER)
+"""
+
+import glob
+import json
+import os
+import statistics
+import sys
+import argparse
+from collections import defaultdict
+
+
+DEFAULT_TIMING_GLOB = "/mnt/ddn/infinia_setup/scripts/cmd_output/step_timing_*.jsonl"
+
+
+def load_records(paths):
+    """Load step records from JSONL files, skipping malformed lines"""
+    records = []
+    for path in paths:
+        try:
+            with open(path, 'r') as f:
+                for line_no, line in enumerate(f, 1):
+                    line = line.strip()
+                    if not line:
+                        continue
+                    try:
+                        records.append(json.loads(line))
+                    except json.JSONDecodeError:
+                        print(f"Warning: skipping malformed line {line_no} in {path}", file=sys.stderr)
+        except OSError as e:
+            print(f"Warning: could not read {path} ({e})", file=sys.stderr)
+    return records
+
+
+def phase_durations(records):
+    """Sum step durations per (red_ver, phase, run_id, host)
+
+    Returns {red_ver: {phase: [duration_ms per run/host]}} and failure counts
+    keyed the same way.
+    """
+    totals = defaultdict(int)
+    failures = defaultdict(int)
+    for rec in records:
+        key = (rec.get('red_ver', 'unknown'), rec.get('phase', 'unknown'),
+               rec.get('run_id', ''), rec.get('host', ''))
+        totals[key] += rec.get('duration_ms', 0)
+        if rec.get('exit_code', 0) != 0:
+            failures[key[:2]] += 1
+
+    durations = defaultdict(lambda: defaultdict(list))
+    for (red_ver, phase, _, _), duration_ms in totals.items():
+        durations[red_ver][phase].append(duration_ms)
+    return durations, failures
+
+
+def summarize(durations, failures):
+    """Compute count/median/mean/max per release and phase"""
+    summary = {}
+    for red_ver, phases in sorted(durations.items()):
+        summary[red_ver] = {}
+        for phase, values in sorted(phases.items()):
+            summary[red_ver][phase] = {
+                'samples': len(values),
+                'median_s': round(statistics.median(values) / 1000.0, 3),
+                'mean_s': round(statistics.mean(values) / 1000.0, 3),
+                'max_s': round(max(values) / 1000.0, 3),
+                'failed_steps': failures.get((red_ver, phase), 0)
+            }
+    return summary
+
+
+def compare_releases(summary, base_ver, new_ver, threshold_pct):
+    """Compare median phase timings between two releases"""
+    if base_ver not in summary or new_ver not in summary:
+        missing = [v for v in (base_ver, new_ver) if v not in summary]
+        print(f"Error: no timing records for RED_VER {', '.join(missing)}", file=sys.stderr)
+        sys.exit(1)
+
+    comparison = []
+    for phase in sorted(set(summary[base_ver]) | set(summary[new_ver])):
+        base = summary[base_ver].get(phase)
+        new = summary[new_ver].get(phase)
+        entry = {
+            'phase': phase,
+            'base_median_s': base['median_s'] if base else None,
+            'new_median_s': new['median_s'] if new else None,
+            'delta_pct': None,
+            'regression': False
+        }
+        if base and new and base['median_s'] > 0:
+            delta_pct = (new['median_s'] - base['median_s']) * 100.0 / base['median_s']
+            entry['delta_pct'] = round(delta_pct, 1)
+            entry['regression'] = delta_pct > threshold_pct
+        comparison.append(entry)
+    return comparison
+
+
+def print_summary(summary, file=sys.stdout):
+    """Print per-release, per-phase timings"""
+    for red_ver, phases in summary.items():
+        print(f"\n=== RED_VER {red_ver} ===", file=file)
+        print(f"{'phase':<20} {'samples':>7} {'median(s)':>10} {'mean(s)':>10} {'max(s)':>10} {'failed':>6}", file=file)
+        for phase, stats in phases.items():
+            print(f"{phase:<20} {stats['samples']:>7} {stats['median_s']:>10.3f} {stats['mean_s']:>10.3f} "
+                  f"{stats['max_s']:>10.3f} {stats['failed_steps']:>6}", file=file)
+
+
+def print_comparison(comparison, base_ver, new_ver, file=sys.stdout):
+    """Print the per-phase comparison between two releases"""
+    print(f"\n=== {base_ver} -> {new_ver} ===", file=file)
+    print(f"{'phase':<20} {'base(s)':>10} {'new(s)':>10} {'delta':>8}", file=file)
+    for entry in comparison:
+        base = f"{entry['base_median_s']:.3f}" if entry['base_median_s'] is not None else "-"
+        new = f"{entry['new_median_s']:.3f}" if entry['new_median_s'] is not None else "-"
+        delta = f"{entry['delta_pct']:+.1f}%" if entry['delta_pct'] is not None else "-"
+        flag = "  REGRESSION" if entry['regression'] else ""
+        print(f"{entry['phase']:<20} {base:>10} {new:>10} {delta:>8}{flag}", file=file)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Report per-phase setup/teardown timings from step timing records'
+    )
+    parser.add_argument(
+        'files',
+        nargs='*',
+        help=f'Step timing JSONL files (default: {DEFAULT_TIMING_GLOB})'
+    )
+    parser.add_argument(
+        '--compare',
+        nargs=2,
+        metavar=('BASE_VER', 'NEW_VER'),
+        help='Compare median phase timings between two RED_VER releases'
+    )
+    parser.add_argument(
+        '--threshold',
+        type=float,
+        default=10.0,
+        help='Slowdown in percent reported as a regression (default: 10)'
+    )
+    parser.add_argument(
+        '--script',
+        type=str,
+        help='Only include records from this script (e.g. infinia_cluster_setup.sh)'
+    )
+    parser.add_argument(
+        '--format',
+        choices=['text', 'json'],
+        default='text',
+        help='Output format (default: text)'
+    )
+
+    args = parser.parse_args()
+
+    paths = args.files or sorted(glob.glob(DEFAULT_TIMING_GLOB))
+    if not paths:
+        print(f"Error: no step timing files found matching {DEFAULT_TIMING_GLOB}", file=sys.stderr)
+        sys.exit(1)
+
+    records = load_records(paths)
+    if args.script:
+        records = [r for r in records if r.get('script') == os.path.basename(args.script)]
+    if not records:
+        print("Error: no step timing records found", file=sys.stderr)
+        sys.exit(1)
+
+    durations, failures = phase_durations(records)
+    summary = summarize(durations, failures)
+
+    comparison = None
+    if args.compare:
+        comparison = compare_releases(summary, args.compare[0], args.compare[1], args.threshold)
+
+    if args.format == 'json':
+        result = {'phases': summary}
+        if comparison is not None:
+            result['comparison'] = comparison
+        print(json.dumps(result, indent=2))
+    else:
+        print_summary(summary)
+        if comparison is not None:
+            print_comparison(comparison, args.compare[0], args.compare[1])
+
+    # Non-zero exit lets CI jobs fail on a regression
+    if comparison and any(entry['regression'] for entry in comparison):
+        sys.exit(2)
+
+
+if __name__ == "__main__":
+    main()
@@ -10,24 +10,31 @@ SLEEPT=2
 
 CMD_OUTPUT_FILE=$BASE_CMD_OUTPUT_FILE"_`date +%F-%T`.txt"
 
+# Per-step timing, see infinia_step_timing.sh; without it the steps just run
+if [ -f "$(dirname "$0")/infinia_step_timing.sh" ]; then
+	source "$(dirname "$0")/infinia_step_timing.sh"
+else
+	run_step () { shift 2; "$@"; }
+fi
+
 echo "Infinia cluster setup in node: `hostname` at: `date`" 2>&1 | tee -a $CMD_OUTPUT_FILE
 echo "Login as realm_admin" 2>&1 | tee -a $CMD_OUTPUT_FILE
-redcli user login realm_admin --password $REALM_ADMIN_PASSWD 2>&1 | tee -a $CMD_OUTPUT_FILE
+run_step login realm_admin_login redcli user login realm_admin --password $REALM_ADMIN_PASSWD
 sleep $SLEEPT
 
 echo "redcli inventory show" 2>&1 | tee -a $CMD_OUTPUT_FILE
-redcli inventory show 2>&1 | tee -a $CMD_OUTPUT_FILE
+run_step config inventory_show redcli inventory show
 
 echo "Generate config" 2>&1 | tee -a $CMD_OUTPUT_FILE
-redcli realm config update --generate 2>&1 | tee -a $CMD_OUTPUT_FILE
+run_step config realm_config_generate redcli realm config update --generate
 sleep $SLEEPT
 
 echo "Login as realm_admin" 2>&1 | tee -a $CMD_OUTPUT_FILE
-redcli user login realm_admin --password $REALM_ADMIN_PASSWD 2>&1 | tee -a $CMD_OUTPUT_FILE
+run_step login realm_admin_relogin redcli user login realm_admin --password $REALM_ADMIN_PASSWD
 sleep $SLEEPT
 
 echo "License install" 2>&1 | tee -a $CMD_OUTPUT_FILE
-redcli license install -a $INFINIA_LICENSE_KEY -y 2>&1 | tee -a $CMD_OUTPUT_FILE
+run_step license license_install redcli license install -a $INFINIA_LICENSE_KEY -y
 
 echo "Infinia cluster creation: `date`"
 # TCP
@@ -35,23 +42,23 @@ echo "Infinia cluster creation: `date`"
 #redcli cluster create -z cluster1 -S=true -n tcp 2>&1 | tee -a $CMD_OUTPUT_FILE
 # RDMA
 echo "redcli cluster create -z cluster1 -S=true" 2>&1 | tee -a $CMD_OUTPUT_FILE
-redcli cluster create -z cluster1 -S=true 2>&1 | tee -a $CMD_OUTPUT_FILE
+run_step cluster cluster_create redcli cluster create -z cluster1 -S=true
 sleep $SLEEPT
 
 echo "Infinia cluster creation successful: `date`" 2>&1 | tee -a $CMD_OUTPUT_FILE
-redcli cluster show cluster1 2>&1 | tee -a $CMD_OUTPUT_FILE
+run_step cluster cluster_show redcli cluster show cluster1
 sleep $SLEEPT
 
 echo "Infinia cluster status `date`" 2>&1 | tee -a $CMD_OUTPUT_FILE
-redcli cluster show cluster1 --status 2>&1 | tee -a $CMD_OUTPUT_FILE
+run_step cluster cluster_status redcli cluster show cluster1 --status
 sleep $SLEEPT
 
 echo "Infinia cluster health `date`" 2>&1 | tee -a $CMD_OUTPUT_FILE
-redcli cluster show cluster1 --health 2>&1 | tee -a $CMD_OUTPUT_FILE
+run_step cluster cluster_health redcli cluster show cluster1 --health
 sleep $SLEEPT
 
 echo "Infinia Cluster compression and encryption setting" 2>&1 | tee -a $CMD_OUTPUT_FILE
-redcli config show runtime  -o json | egrep 'encryption|compression' 2>&1 | tee -a $CMD_OUTPUT_FILE
+run_step cluster runtime_config_show bash -c "redcli config show runtime  -o json | egrep 'encryption|compression'"
 
 echo "Realm Agent Status" 2>&1 | tee -a $CMD_OUTPUT_FILE
-redcli realm agent-status 2>&1 | tee -a $CMD_OUTPUT_FILE
+run_step cluster realm_agent_status redcli realm agent-status
@@ -14,6 +14,13 @@ SLEEPT=1
 # DO NOT EDIT BELOW, UNLESS NECESSARY
 
 CMD_OUTPUT_FILE=$BASE_CMD_OUTPUT_FILE"_`date +%F-%T`.txt"
+
+# Per-step timing, see infinia_step_timing.sh; without it the steps just run
+if [ -f "$(dirname "$0")/infinia_step_timing.sh" ]; then
+	source "$(dirname "$0")/infinia_step_timing.sh"
+else
+	run_step () { shift 2; "$@"; }
+fi
 echo "Setting Infinia on the realm entry node: `date`" 2>&1 | tee -a $CMD_OUTPUT_FILE
 
 export BASE_PKG_URL="https://storage.googleapis.com/ddn-redsetup-public" &&
@@ -23,8 +30,8 @@ export REL_DIST_PATH="ubuntu/24.04" && \
 export REL_PKG_URL="${BASE_PKG_URL}/releases${RELEASE_TYPE}/${REL_DIST_PATH}" && \
 export RED_VER="2.1.30"
 
-wget $REL_PKG_URL/redsetup_"${RED_VER}"_"${TARGET_ARCH}${RELEASE_TYPE}".deb?cache-time="$(date +$s)" -O /tmp/redsetup.deb && \
-sudo apt install -y /tmp/redsetup.deb 2>&1 | tee -a $CMD_OUTPUT_FILE
+run_step install download_redsetup wget $REL_PKG_URL/redsetup_"${RED_VER}"_"${TARGET_ARCH}${RELEASE_TYPE}".deb?cache-time="$(date +$s)" -O /tmp/redsetup.deb && \
+run_step install apt_install_redsetup sudo apt install -y /tmp/redsetup.deb
 
 echo "RED Version is $RED_VER" 2>&1 | tee -a $CMD_OUTPUT_FILE
 echo "------------------------" 2>&1 | tee -a $CMD_OUTPUT_FILE
@@ -32,7 +39,7 @@ sleep $SLEEPT
 
 echo "redsetup version" 2>&1 | tee -a $CMD_OUTPUT_FILE
 echo "---------------" 2>&1 | tee -a $CMD_OUTPUT_FILE
-redsetup -v 2>&1 | tee -a $CMD_OUTPUT_FILE
+run_step redsetup redsetup_version redsetup -v
 
 sleep $SLEEPT
 
@@ -41,8 +48,8 @@ echo "-----------------------" 2>&1 | tee -a $CMD_OUTPUT_FILE
 
 echo "sudo redsetup --realm-entry --realm-entry-secret $REALM_ENTRY_SECRET  --admin-password $REALM_ADMIN_PASSWD \
         -ctrl-plane-ip $(ip addr | grep inet | grep -v inet6 | grep $CTRL_PLANE_IP_SUBNET |awk '{print $2}' |sed 's/\/'"$CTRL_PLANE_IP_SUBNET_MASK"'//')" 2>&1 | tee -a $CMD_OUTPUT_FILE
-sudo redsetup --realm-entry --realm-entry-secret $REALM_ENTRY_SECRET  --admin-password $REALM_ADMIN_PASSWD \
-	-ctrl-plane-ip $(ip addr | grep inet | grep -v inet6 | grep $CTRL_PLANE_IP_SUBNET |awk '{print $2}' |sed 's/\/'"$CTRL_PLANE_IP_SUBNET_MASK"'//') 2>&1 | tee -a $CMD_OUTPUT_FILE
+run_step redsetup redsetup_realm_entry sudo redsetup --realm-entry --realm-entry-secret $REALM_ENTRY_SECRET  --admin-password $REALM_ADMIN_PASSWD \
+	-ctrl-plane-ip $(ip addr | grep inet | grep -v inet6 | grep $CTRL_PLANE_IP_SUBNET |awk '{print $2}' |sed 's/\/'"$CTRL_PLANE_IP_SUBNET_MASK"'//')
 
 echo "Backing up the old realm_config.yaml to /tmp" 2>&1 | tee -a $CMD_OUTPUT_FILE 
 mv $REALM_CONFIG_YAML_DIR/realm_config.yaml $REALM_CONFIG_YAML_BACKUP_DIR
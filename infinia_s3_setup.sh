@@ -14,6 +14,13 @@ SLEEPT=1
 
 CMD_OUTPUT_FILE=$BASE_CMD_OUTPUT_FILE"_`date +%F-%T`.txt"
 
+# Per-step timing, see infinia_step_timing.sh; without it the steps just run
+if [ -f "$(dirname "$0")/infinia_step_timing.sh" ]; then
+	source "$(dirname "$0")/infinia_step_timing.sh"
+else
+	run_step () { shift 2; "$@"; }
+fi
+
 get_user_input () {
         
         echo "Proceed to next step: Y/N"
@@ -24,49 +31,49 @@ get_user_input () {
 echo "Setting up Infinia S3 in node: `hostname` at: `date`" 2>&1 | tee -a $CMD_OUTPUT_FILE
 
 echo "Login as Realm Admin and Verify Cluster Status" 2>&1 | tee -a $CMD_OUTPUT_FILE
-redcli user login realm_admin --password $REALM_ADMIN_PASSWD 2>&1 | tee -a $CMD_OUTPUT_FILE
-redcli cluster show cluster1 2>&1 | tee -a $CMD_OUTPUT_FILE
+run_step login realm_admin_login redcli user login realm_admin --password $REALM_ADMIN_PASSWD
+run_step cluster cluster_show redcli cluster show cluster1
 sleep $SLEEPT
 #get_user_input
 
 echo "Grant realm_admin access to Tenant red" 2>&1 | tee -a $CMD_OUTPUT_FILE
-redcli user grant realm_admin red 2>&1 | tee -a $CMD_OUTPUT_FILE
-redcli user grant realm_admin red/red 2>&1 | tee -a $CMD_OUTPUT_FILE
+run_step s3 grant_tenant redcli user grant realm_admin red
+run_step s3 grant_subtenant redcli user grant realm_admin red/red
 sleep $SLEEPT
 
 echo "Add admin user for tenant red and grant access" 2>&1 | tee -a $CMD_OUTPUT_FILE
-redcli user add admin -p $REALM_ADMIN_PASSWD --scope red -t red 2>&1 | tee -a $CMD_OUTPUT_FILE
-redcli user grant admin red/red -t red 2>&1 | tee -a $CMD_OUTPUT_FILE
-redcli s3 access add admin --scope red/red/redobj -e 10y 2>&1 | tee -a $CMD_OUTPUT_FILE
+run_step s3 add_admin_user redcli user add admin -p $REALM_ADMIN_PASSWD --scope red -t red
+run_step s3 grant_admin redcli user grant admin red/red -t red
+run_step s3 s3_access_add redcli s3 access add admin --scope red/red/redobj -e 10y
 sleep $SLEEPT
 #get_user_input
 
 echo "Create S3 Buckets and Verify" 2>&1 | tee -a $CMD_OUTPUT_FILE
-redcli user login admin -p $REALM_ADMIN_PASSWD -t red 2>&1 | tee -a $CMD_OUTPUT_FILE
+run_step s3 admin_login redcli user login admin -p $REALM_ADMIN_PASSWD -t red
 sleep $SLEEPT
 
-redcli s3 bucket create bucket1 -t red 2>&1 | tee -a $CMD_OUTPUT_FILE
-redcli s3 bucket create bucket2 -t red 2>&1 | tee -a $CMD_OUTPUT_FILE
-redcli s3 bucket create bucket3 -t red 2>&1 | tee -a $CMD_OUTPUT_FILE
+run_step s3 bucket1_create redcli s3 bucket create bucket1 -t red
+run_step s3 bucket2_create redcli s3 bucket create bucket2 -t red
+run_step s3 bucket3_create redcli s3 bucket create bucket3 -t red
 sleep $SLEEPT
 
 echo "S3 Buckets created successfully" 2>&1 | tee -a $CMD_OUTPUT_FILE
-redcli s3 bucket list -t red | grep bucket 2>&1 | tee -a $CMD_OUTPUT_FILE
+run_step s3 bucket_list bash -c "redcli s3 bucket list -t red | grep bucket"
 sleep $SLEEPT
 #get_user_input
 
 echo "Please Update .bashrc and aws/credentials with the ACCESS_KEY and SECRET_KEY" 2>&1 | tee -a $CMD_OUTPUT_FILE
 sleep $SLEEPT
 
-redcli user list -t red 2>&1 | tee -a $CMD_OUTPUT_FILE
+run_step s3 user_list redcli user list -t red
 
 echo "Copying $CERT_FILE to $HOMEDIR" 2>&1 | tee -a $CMD_OUTPUT_FILE
-sudo cp /etc/red/certs/$CERT_FILE ~/ 2>&1 | tee -a $CMD_OUTPUT_FILE
-sudo chmod 0755 ~/$CERT_FILE 2>&1 | tee -a $CMD_OUTPUT_FILE
+run_step s3 cert_copy_home sudo cp /etc/red/certs/$CERT_FILE ~/
+run_step s3 cert_chmod_home sudo chmod 0755 ~/$CERT_FILE
 
 echo "Copying $CERT_FILE to rest of the Infinia and Client Nodes" 2>&1 | tee -a $CMD_OUTPUT_FILE
-sudo cp ~/$CERT_FILE $REPO_DIR 2>&1 | tee -a $CMD_OUTPUT_FILE
-sudo chmod 0755 $REPO_DIR/$CERT_FILE 2>&1 | tee -a $CMD_OUTPUT_FILE
-pdsh -w $NON_REALM_AND_CLIENT_NODES "cp $REPO_DIR/$CERT_FILE $HOME_DIR" 2>&1 | tee -a $CMD_OUTPUT_FILE
-pdsh -w $NON_REALM_AND_CLIENT_NODES "sudo chmod 0755 $HOME_DIR/$CERT_FILE" 2>&1 | tee -a $CMD_OUTPUT_FILE
-pdsh -w $ALL_NODES "md5sum $HOME_DIR/$CERT_FILE" | dshbak -c 2>&1 | tee -a $CMD_OUTPUT_FILE
+run_step s3 cert_copy_repo sudo cp ~/$CERT_FILE $REPO_DIR
+run_step s3 cert_chmod_repo sudo chmod 0755 $REPO_DIR/$CERT_FILE
+run_step s3 cert_distribute pdsh -w $NON_REALM_AND_CLIENT_NODES "cp $REPO_DIR/$CERT_FILE $HOME_DIR"
+run_step s3 cert_chmod_nodes pdsh -w $NON_REALM_AND_CLIENT_NODES "sudo chmod 0755 $HOME_DIR/$CERT_FILE"
+run_step s3 cert_verify bash -c "pdsh -w $ALL_NODES 'md5sum $HOME_DIR/$CERT_FILE' | dshbak -c"
@@ -0,0 +1,78 @@
+#!/bin/bash
+#
+# Step timing instrumentation shared by the setup, S3 and teardown scripts.
+#
+# Source this file, then wrap each step with:
+#
+#   run_step <phase> <step> <command> [args...]
+#
+# The command output is still shown on the terminal and appended to
+# $CMD_OUTPUT_FILE (when set). One JSON line per step is appended to
+# $STEP_TIMING_FILE with host, start/end timestamps, duration, exit code
+# and output size. Use infinia-step-timing-report.py to aggregate the runs.
+#
+# Commands containing pipes have to be wrapped, e.g.
+#   run_step s3 list_buckets bash -c "redcli s3 bucket list -t red | grep bucket"
+#
+# Set STEP_HOST for a single call to record the node a remote step ran on.
+# Use a separate phase when the remote script records its own steps, so the
+# report does not mix the wrapper total with the inner steps:
+#   STEP_HOST=node$i run_step teardown_remote teardown_node ssh node$i "sudo teardown.sh"
+
+STEP_TIMING_DIR="${STEP_TIMING_DIR:-${CMD_OUTPUT_DIR:-$(dirname "$0")/cmd_output}}"
+STEP_TIMING_FILE="${STEP_TIMING_FILE:-$STEP_TIMING_DIR/step_timing_`hostname`.jsonl}"
+STEP_TIMING_SCRIPT="$(basename "$0")"
+STEP_TIMING_RUN_ID="${STEP_TIMING_RUN_ID:-`hostname`_${STEP_TIMING_SCRIPT%.sh}_`date +%F-%T`}"
+
+# RED_VER is exported by the install scripts and passed to remote steps by the
+# p_* wrappers; fall back to the installed package
+STEP_TIMING_RED_VER="$(dpkg-query -W -f='${Version}' redsetup 2>/dev/null)"
+
+mkdir -p "$STEP_TIMING_DIR" 2>/dev/null
+# Scripts run with and without sudo share the file, keep it writable for both
+if [ ! -e "$STEP_TIMING_FILE" ]; then
+	touch "$STEP_TIMING_FILE" 2>/dev/null && chmod a+w "$STEP_TIMING_FILE" 2>/dev/null
+fi
+
+_step_json_str () {
+	local s="${1//\\/\\\\}"
+	s="${s//\"/\\\"}"
+	printf '"%s"' "$s"
+}
+
+run_step () {
+	local phase="$1"
+	local step="$2"
+	shift 2
+
+	local host="${STEP_HOST:-`hostname`}"
+	local red_ver="${RED_VER:-${STEP_TIMING_RED_VER:-unknown}}"
+	local out_tmp
+	out_tmp="$(mktemp)"
+
+	local start_ts start_ns end_ts end_ns rc out_bytes
+	start_ts="$(date -u +%FT%T.%3NZ)"
+	start_ns="$(date +%s%N)"
+
+	if [ -n "$CMD_OUTPUT_FILE" ]; then
+		"$@" 2>&1 | tee -a "$CMD_OUTPUT_FILE" "$out_tmp"
+	else
+		"$@" 2>&1 | tee "$out_tmp"
+	fi
+	rc=${PIPESTATUS[0]}
+
+	end_ns="$(date +%s%N)"
+	end_ts="$(date -u +%FT%T.%3NZ)"
+	out_bytes="$(wc -c < "$out_tmp")"
+	rm -f "$out_tmp"
+
+	printf '{"run_id":%s,"script":%s,"host":%s,"red_ver":%s,"phase":%s,"step":%s,"start":"%s","end":"%s","duration_ms":%d,"exit_code":%d,"output_bytes":%d}\n' \
+		"$(_step_json_str "$STEP_TIMING_RUN_ID")" "$(_step_json_str "$STEP_TIMING_SCRIPT")" \
+		"$(_step_json_str "$host")" "$(_step_json_str "$red_ver")" \
+		"$(_step_json_str "$phase")" "$(_step_json_str "$step")" \
+		"$start_ts" "$end_ts" $(( (end_ns - start_ns) / 1000000 )) "$rc" "$out_bytes" \
+		2>/dev/null >> "$STEP_TIMING_FILE" || \
+		echo "Warning: could not append step timing record to $STEP_TIMING_FILE" >&2
+
+	return $rc
+}
@@ -11,13 +11,20 @@ LAST_NODE=18
 SLEEPT=1
 
 CMD_OUTPUT_FILE=$BASE_CMD_OUTPUT_FILE"_`date +%F-%T`.txt"
+
+# Per-step timing, see infinia_step_timing.sh; without it the steps just run
+if [ -f "$(dirname "$0")/infinia_step_timing.sh" ]; then
+	source "$(dirname "$0")/infinia_step_timing.sh"
+else
+	run_step () { shift 2; "$@"; }
+fi
 echo "Tearing down the Infnia client setup on client nodes: `date`" 2>&1 | tee -a $CMD_OUTPUT_FILE
 
 # Infinia Server Nodes for 12 x node cluster - srt[013-024] 
 for((i=$FIRST_NODE;i<=$LAST_NODE;i++));
 do
 	echo "Tearing down the RED Client setup from client node srt0$i at : `date`" 2>&1 | tee -a $CMD_OUTPUT_FILE
-	ssh srt0$i "sudo $TEARDOWN_SCRIPT" 2>&1 | tee -a $CMD_OUTPUT_FILE
+	STEP_HOST=srt0$i run_step client_teardown teardown_client ssh srt0$i "sudo RED_VER=$RED_VER $TEARDOWN_SCRIPT"
 	sleep $SLEEPT
 	echo "============================================================" 2>&1 | tee -a $CMD_OUTPUT_FILE
 
@@ -11,14 +11,24 @@ SLEEPT=1
 # DO NOT EDIT BELOW, UNLESS NECESSARY
 
 CMD_OUTPUT_FILE=$BASE_CMD_OUTPUT_FILE"_`date +%F-%T`.txt"
+
+# Per-step timing, see infinia_step_timing.sh; without it the steps just run
+if [ -f "$(dirname "$0")/infinia_step_timing.sh" ]; then
+	source "$(dirname "$0")/infinia_step_timing.sh"
+else
+	run_step () { shift 2; "$@"; }
+fi
 echo "Setting up Infinia in the Cluster worker nodes: `date`" 2>&1 | tee -a $CMD_OUTPUT_FILE
 
+# Record the release the worker script installs, not the one on this client
+export RED_VER="${RED_VER:-$(sed -n 's/^export RED_VER="\(.*\)"/\1/p' $SETUP_WORKER_SCRIPT 2>/dev/null)}"
+
 # Infinia Worker Server Nodes for 6 x node cluster - node[1-6]
 for((i=$FIRST_NODE;i<=$LAST_NODE;i++));
 do
 	echo "Setting up Infinia in worker node node$i at : `date`" 2>&1 | tee -a $CMD_OUTPUT_FILE
 	echo "---------------------------------------------------" 2>&1 | tee -a $CMD_OUTPUT_FILE
-	ssh node$i "$SETUP_WORKER_SCRIPT" 2>&1 | tee -a $CMD_OUTPUT_FILE
+	STEP_HOST=node$i run_step setup_worker setup_worker_node ssh node$i "RED_VER=$RED_VER $SETUP_WORKER_SCRIPT"
 	sleep $SLEEPT
 	echo "============================================================" 2>&1 | tee -a $CMD_OUTPUT_FILE
 
@@ -9,13 +9,23 @@ LAST_NODE=6
 SLEEPT=1
 
 CMD_OUTPUT_FILE=$BASE_CMD_OUTPUT_FILE"_`date +%F-%T`.txt"
+
+# Per-step timing, see infinia_step_timing.sh; without it the steps just run
+if [ -f "$(dirname "$0")/infinia_step_timing.sh" ]; then
+	source "$(dirname "$0")/infinia_step_timing.sh"
+else
+	run_step () { shift 2; "$@"; }
+fi
 echo "Tearing down the Infnia setup from all the Cluster nodes: `date`" 2>&1 | tee -a $CMD_OUTPUT_FILE
 
+# Record the release being torn down, not the one installed on this client
+export RED_VER="${RED_VER:-$(ssh node$FIRST_NODE "dpkg-query -W -f='\${Version}' redsetup" 2>/dev/null)}"
+
 # Infinia Server Nodes for 6 x node cluster 
 for((i=$LAST_NODE;i>=$FIRST_NODE;i--));
 do
 	echo "Removing config.lock on node node$i at : `date`" 2>&1 | tee -a $CMD_OUTPUT_FILE
-	ssh node$i "sudo rm -f /etc/red/deploy/config.lock" 2>&1 | tee -a $CMD_OUTPUT_FILE
+	STEP_HOST=node$i run_step teardown_remote remove_config_lock ssh node$i "sudo rm -f /etc/red/deploy/config.lock"
 	sleep $SLEEPT
 	echo "============================================================" 2>&1 | tee -a $CMD_OUTPUT_FILE
 
@@ -26,7 +36,7 @@ sleep $SLEEPT
 for((i=$LAST_NODE;i>=$FIRST_NODE;i--));
 do
 	echo "Tearing down the RED setup from cluster node node$i at : `date`" 2>&1 | tee -a $CMD_OUTPUT_FILE
-	ssh node$i "sudo $TEARDOWN_SCRIPT" 2>&1 | tee -a $CMD_OUTPUT_FILE
+	STEP_HOST=node$i run_step teardown_remote teardown_node ssh node$i "sudo RED_VER=$RED_VER $TEARDOWN_SCRIPT"
 	sleep $SLEEPT
 	echo "============================================================" 2>&1 | tee -a $CMD_OUTPUT_FILE
 
@@ -24,6 +24,7 @@ import yaml
 from collections import defaultdict
 from typing import List, Dict, Tuple, Set
 import argparse
+import os
 import sys
 
 
@@ -48,9 +49,18 @@ class SystemTopology:
         self.numa_nodes = {}
         self.total_cores = 0
         self.total_threads = 0
+        self.threads_per_core = 2
+        self.cache_domains = {}      # CPU -> (LLC id, L2 id), pairs cores when there is no SMT
         self.nvme_devices = []
         self.mellanox_adapters = []
         self.filesystem_nvme = set()
+        self.memory_only_nodes = []  # NUMA nodes without CPUs (CXL expanders, HBM)
+        self.numa_distances = {}     # node -> {node: distance}
+        self.node_sockets = {}       # CPU node -> physical package id
+        self.core_ranking = {}       # CPU -> preferred core rank, higher is faster
+        self.core_ranking_source = None
+        self.itmt_enabled = None
+        self.cpufreq = {}            # CPU -> {'governor': ..., 'epp': ...}
         
     def parse_lscpu(self):
         """Parse lscpu output to get NUMA topology"""
@@ -68,6 +78,15 @@ class SystemTopology:
             if cores_match and sockets_match:
                 self.total_cores = int(cores_match.group(1)) * int(sockets_match.group(1))
             
+            # 1 with SMT disabled and on most arm64 servers
+            threads_match = re.search(r'Thread\(s\) per core:\s+(\d+)', output)
+            if threads_match:
+                self.threads_per_core = int(threads_match.group(1))
+            
+            # Recent lscpu reports "Core(s) per cluster" and no sockets on arm64
+            if not self.total_cores and self.total_threads:
+                self.total_cores = self.total_threads // max(self.threads_per_core, 1)
+            
             # Parse NUMA nodes
             numa_pattern = re.compile(r'NUMA node(\d+) CPU\(s\):\s+([\d,\-]+)')
             for match in numa_pattern.finditer(output):
@@ -89,6 +108,205 @@ class SystemTopology:
         
         # Parse for Mellanox adapters
         self._parse_mellanox_adapters_lspci()
+        
+        # Devices on CPU-less nodes are served from the nearest CPU node
+        self.resolve_device_numa()
+    
+    def parse_numa_sysfs(self, sysfs_root='/sys/devices/system'):
+        """Parse CPU-less nodes, NUMA distances and node sockets from sysfs
+        
+        lscpu only lists NUMA nodes that have CPUs, so CXL memory expanders and
+        other memory-only nodes are picked up here.
+        """
+        node_root = os.path.join(sysfs_root, 'node')
+        try:
+            entries = os.listdir(node_root)
+        except OSError:
+            return
+        
+        node_ids = sorted(int(m.group(1)) for m in (re.match(r'node(\d+)$', e) for e in entries) if m)
+        for numa_id in node_ids:
+            node_dir = os.path.join(node_root, f'node{numa_id}')
+            try:
+                with open(os.path.join(node_dir, 'cpulist'), 'r') as f:
+                    cpulist = f.read().strip()
+                with open(os.path.join(node_dir, 'distance'), 'r') as f:
+                    distances = [int(d) for d in f.read().split()]
+            except (OSError, ValueError):
+                continue
+            
+            # The distance row follows the order of the online nodes
+            self.numa_distances[numa_id] = dict(zip(node_ids, distances))
+            
+            if not cpulist:
+                self.memory_only_nodes.append(numa_id)
+                continue
+            if numa_id not in self.numa_nodes:
+                self.numa_nodes[numa_id] = self._parse_cpu_list(cpulist)
+            
+            first_cpu = self.numa_nodes[numa_id][0]
+            try:
+                with open(os.path.join(sysfs_root, 'cpu', f'cpu{first_cpu}', 'topology', 'physical_package_id'), 'r') as f:
+                    self.node_sockets[numa_id] = int(f.read().strip())
+            except (OSError, ValueError):
+                pass
+        
+        if self.memory_only_nodes:
+            print(f"Found CPU-less NUMA nodes: {self.memory_only_nodes}")
+    
+    def parse_cache_sysfs(self, sysfs_root='/sys/devices/system'):
+        """Parse the L2 and last level cache each CPU shares, used to pair cores without SMT"""
+        for cpus in self.numa_nodes.values():
+            for cpu in cpus:
+                cache_dir = os.path.join(sysfs_root, 'cpu', f'cpu{cpu}', 'cache')
+                try:
+                    indexes = [e for e in os.listdir(cache_dir) if e.startswith('index')]
+                except OSError:
+                    continue
+                
+                shared = {}
+                for index in indexes:
+                    try:
+                        with open(os.path.join(cache_dir, index, 'type'), 'r') as f:
+                            if f.read().strip() == 'Instruction':
+                                continue
+                        with open(os.path.join(cache_dir, index, 'level'), 'r') as f:
+                            level = int(f.read().strip())
+                        with open(os.path.join(cache_dir, index, 'shared_cpu_list'), 'r') as f:
+                            shared[level] = self._parse_cpu_list(f.read().strip())[0]
+                    except (OSError, ValueError, IndexError):
+                        continue
+                
+                if shared:
+                    # The lowest CPU sharing a cache identifies it
+                    self.cache_domains[cpu] = (shared[max(shared)], shared.get(2, cpu))
+    
+    # Per-CPU ranking files, most specific first (all higher is better)
+    CORE_RANKING_SOURCES = (
+        'cpufreq/amd_pstate_prefcore_ranking',
+        'acpi_cppc/highest_perf',
+        'cpufreq/cpuinfo_max_freq',
+    )
+    
+    def parse_core_ranking_sysfs(self, sysfs_root='/sys/devices/system', procfs_root='/proc'):
+        """Parse preferred core rankings and cpufreq settings from sysfs
+        
+        The first source that ranks the cores differently is used, identical
+        values on all cores mean there are no preferred cores to pick.
+        """
+        cpus = sorted(c for node in self.numa_nodes.values() for c in node)
+        
+        def read(cpu, name):
+            try:
+                with open(os.path.join(sysfs_root, 'cpu', f'cpu{cpu}', name), 'r') as f:
+                    return f.read().strip()
+            except OSError:
+                return None
+        
+        for source in self.CORE_RANKING_SOURCES:
+            ranking = {}
+            for cpu in cpus:
+                value = read(cpu, source)
+                if value and value.isdigit():
+                    ranking[cpu] = int(value)
+            if len(set(ranking.values())) > 1:
+                self.core_ranking = ranking
+                self.core_ranking_source = source
+                break
+        
+        for cpu in cpus:
+            governor = read(cpu, 'cpufreq/scaling_governor')
+            if governor is not None:
+                self.cpufreq[cpu] = {
+                    'governor': governor,
+                    'epp': read(cpu, 'cpufreq/energy_performance_preference')
+                }
+        
+        try:
+            with open(os.path.join(procfs_root, 'sys', 'kernel', 'sched_itmt_enabled'), 'r') as f:
+                self.itmt_enabled = f.read().strip() == '1'
+        except OSError:
+            pass
+        
+        if self.core_ranking:
+            print(f"Found preferred core ranking in {self.core_ranking_source} "
+                  f"({len(set(self.core_ranking.values()))} levels)")
+    
+    def allocation_mode(self):
+        """smt: pair the two threads of a core, core: pair neighbouring cores (one thread per core)"""
+        return 'core' if self.threads_per_core == 1 else 'smt'
+    
+    def thread_pairs(self, numa_id, mode='smt'):
+        """Return the (first, second) CPU pairs of a NUMA node
+        
+        In core mode each core is paired with a neighbour sharing its L2 or last
+        level cache. A core left over in an odd sized cache domain is paired
+        after the others, an odd core of the node is not used.
+        """
+        cpus = self.numa_nodes.get(numa_id, [])
+        if mode == 'smt':
+            # Assuming SMT/HT, split CPUs into two groups
+            mid = len(cpus) // 2
+            return list(zip(cpus[:mid], cpus[mid:]))
+        
+        domains = defaultdict(list)
+        for cpu in sorted(cpus, key=lambda c: (self.cache_domains.get(c, (0, 0)), c)):
+            domains[self.cache_domains.get(cpu, (0, 0))[0]].append(cpu)
+        
+        pairs = []
+        leftover = []
+        for llc in sorted(domains):
+            domain = domains[llc]
+            if len(domain) % 2:
+                leftover.append(domain.pop())
+            pairs.extend(zip(domain[0::2], domain[1::2]))
+        pairs.extend(zip(leftover[0::2], leftover[1::2]))
+        return pairs
+    
+    def nearest_cpu_node(self, numa_id):
+        """Return the CPU node closest to a NUMA node, or None if unknown"""
+        if self.numa_nodes.get(numa_id):
+            return numa_id
+        distances = self.numa_distances.get(numa_id, {})
+        candidates = [(d, n) for n, d in distances.items() if self.numa_nodes.get(n)]
+        if not candidates:
+            return None
+        return min(candidates)[1]
+    
+    def resolve_device_numa(self):
+        """Move devices reported on CPU-less NUMA nodes to the nearest CPU node"""
+        for device in self.nvme_devices + self.mellanox_adapters:
+            numa_id = device['numa_node']
+            if self.numa_nodes.get(numa_id):
+                continue
+            nearest = self.nearest_cpu_node(numa_id)
+            label = device.get('name', device['pci'])
+            if nearest is None:
+                print(f"Warning: {label} is on NUMA node {numa_id} without CPUs and no distance information, "
+                      f"it will not get cores")
+                continue
+            print(f"{label} is on CPU-less NUMA node {numa_id}, using nearest CPU node {nearest}")
+            device['mem_numa_node'] = numa_id
+            device['numa_node'] = nearest
+    
+    def sub_numa_domains(self):
+        """Return {socket: [CPU nodes]} when a socket is split into several nodes (SNC/NPS), else {}"""
+        sockets = defaultdict(list)
+        for numa_id in sorted(self.numa_nodes):
+            if numa_id in self.node_sockets:
+                sockets[self.node_sockets[numa_id]].append(numa_id)
+        if not any(len(nodes) > 1 for nodes in sockets.values()):
+            return {}
+        return dict(sockets)
+    
+    def same_socket_nodes(self, numa_id):
+        """Other CPU nodes of the same socket, nearest first"""
+        socket = self.node_sockets.get(numa_id)
+        if socket is None:
+            return []
+        distances = self.numa_distances.get(numa_id, {})
+        nodes = [n for n, sock in self.node_sockets.items() if sock == socket and n != numa_id]
+        return sorted(nodes, key=lambda n: (distances.get(n, 0), n))
     
     def _get_filesystem_nvme_devices(self):
         """Get list of NVMe devices used by filesystems"""
@@ -194,6 +412,15 @@ class SystemTopology:
         except:
             pass
     
+    def netdev_numa_node(self, netdev):
+        """Return the NUMA node of a network interface, or None if unknown"""
+        try:
+            with open(f'/sys/class/net/{netdev}/device/numa_node', 'r') as f:
+                numa_node = int(f.read().strip())
+                return numa_node if numa_node >= 0 else None
+        except (OSError, ValueError):
+            return None
+    
     def _parse_cpu_list(self, cpu_str):
         """Parse CPU list string like '0-15,128-143' into list of integers"""
         cpus = []
@@ -206,338 +433,767 @@ class SystemTopology:
         return sorted(cpus)
 
 
-class CoreMaskGenerator:
+DEFAULT_ROLE_POLICY = """\
+# Role policy for red-core-mask-generator.py
+#
+# Roles are listed in display/export order and allocated by ascending priority.
+#
+#   hwconfig     section.key the CPU set is written to (a <key>_mems value follows it,
+#                plus a per-CPU <key>_cpu_mems node list for device_local roles on several nodes)
+#   rank_priority  allocation priority with a preferred core ranking, so the fastest cores
+#                go to the roles listed first; defaults to priority
+#   pool         pairs (default): whole thread pairs, first pair of every NUMA node is skipped
+#                housekeeping: single threads from others_cpuset
+#   count        number of pairs/threads, or max_pairs for the --max-pairs value
+#   per_device   {device: nvme|mellanox, ratio: pairs per device, order: device|numa}
+#   smt          pair: both threads, one: first thread (pairs pool only)
+#   sibling_of   takes the second thread of each pair of a role with smt: one
+#   numa         device_local (per_device roles, the default there), balanced or any
+#   partial      housekeeping roles take what is left when short instead of nothing
+#   derive       {copy: role}, {union: [roles]} or {sibling_pairs: role} ("t1:t2" list)
+#   cgroup_partition  isolated to make the role an isolated partition with --apply-cgroup
+#
+# Without SMT (one thread per core, SMT off or arm64) a pair is two neighbouring
+# cores sharing a cache, so sibling roles get a dedicated core.
+roles:
+  - name: cat_cpuset
+    hwconfig: redagent.cat_cpuset
+    priority: 10
+    per_device: {device: nvme, ratio: 1, order: numa}
+    smt: one
+    numa: device_local
+    cgroup_partition: isolated
+  - name: cat_affine_cpuset
+    hwconfig: redagent.cat_affine_cpuset
+    sibling_of: cat_cpuset
+    cgroup_partition: isolated
+  - name: nvmf_cpuset
+    hwconfig: redagent.nvmf_cpuset
+    derive: {copy: cat_affine_cpuset}
+  - name: net_cpuset
+    hwconfig: redagent.net_cpuset
+    priority: 20
+    rank_priority: 5
+    per_device: {device: mellanox, ratio: 2}
+    smt: pair
+    numa: device_local
+    cgroup_partition: isolated
+  - name: handler_cpuset
+    hwconfig: redagent.handler_cpuset
+    derive: {union: [cat_cpuset, cat_affine_cpuset, net_cpuset]}
+  - name: redfs_cpuset
+    hwconfig: reds3.redfs_cpuset
+    sibling_of: reds3_cpuset
+  - name: reds3_cpuset
+    hwconfig: reds3.reds3_cpuset
+    priority: 30
+    count: max_pairs
+    smt: one
+    numa: balanced
+  - name: reds3_sibling_cpuset
+    hwconfig: reds3.reds3_sibling_cpuset
+    derive: {sibling_pairs: reds3_cpuset}
+  - name: posix_cpuset
+    hwconfig: redagent.posix_cpuset
+    priority: 40
+    pool: housekeeping
+    count: 2
+  - name: auxiliary_cpuset
+    hwconfig: redagent.auxiliary_cpuset
+    priority: 50
+    pool: housekeeping
+    count: 1
+  - name: spdk_main_cpuset
+    hwconfig: redagent.spdk_main_cpuset
+    priority: 60
+    pool: housekeeping
+    count: 1
+  - name: etcd_cpuset
+    hwconfig: etcd.cpuset
+    priority: 70
+    pool: housekeeping
+    count: 4
+    partial: true
+"""
+
+
+class RolePolicy:
+    """Declarative description of the CPU roles and how they are allocated"""
+
+    POOLS = ('pairs', 'housekeeping')
+    SMT_MODES = ('pair', 'one')
+    NUMA_MODES = ('device_local', 'balanced', 'any')
+    DEVICE_ORDERS = ('device', 'numa')
+    DERIVE_KINDS = ('copy', 'union', 'sibling_pairs')
+
+    # per_device device name -> SystemTopology attribute
+    DEVICES = {'nvme': 'nvme_devices', 'mellanox': 'mellanox_adapters'}
+
+    def __init__(self, roles: List[Dict]):
+        self.roles = [self._normalize(role) for role in roles]
+
+    @classmethod
+    def load(cls, path: str = None) -> 'RolePolicy':
+        """Load a policy file, or the built-in default policy"""
+        if path:
+            try:
+                with open(path, 'r') as f:
+                    data = yaml.safe_load(f)
+            except (OSError, yaml.YAMLError) as e:
+                print(f"Error: Could not read role policy {path} ({e})")
+                sys.exit(1)
+        else:
+            data = yaml.safe_load(DEFAULT_ROLE_POLICY)
+
+        if not isinstance(data, dict) or not isinstance(data.get('roles'), list):
+            print(f"Error: role policy {path} must contain a 'roles' list")
+            sys.exit(1)
+
+        policy = cls(data['roles'])
+        errors = policy.validate()
+        if errors:
+            for error in errors:
+                print(f"Error: role policy: {error}")
+            sys.exit(1)
+        return policy
+
+    def _normalize(self, role):
+        if not isinstance(role, dict):
+            return {'name': None, 'invalid': role}
+        hwconfig = role.get('hwconfig')
+        per_device = role.get('per_device')
+        return {
+            'name': role.get('name'),
+            'hwconfig': tuple(hwconfig.split('.', 1)) if isinstance(hwconfig, str) and '.' in hwconfig else hwconfig,
+            'priority': role.get('priority', 0),
+            'rank_priority': role.get('rank_priority', role.get('priority', 0)),
+            'pool': role.get('pool', 'pairs'),
+            'count': role.get('count'),
+            'per_device': dict({'ratio': 1, 'order': 'device'}, **per_device) if isinstance(per_device, dict) else per_device,
+            'smt': role.get('smt', 'pair'),
+            'sibling_of': role.get('sibling_of'),
+            'numa': role.get('numa', 'device_local' if per_device is not None else 'any'),
+            'partial': role.get('partial', False),
+            'derive': role.get('derive'),
+            'cgroup_partition': role.get('cgroup_partition')
+        }
+
+    def validate(self) -> List[str]:
+        """Return a list of problems with the policy"""
+        errors = []
+        names = [role['name'] for role in self.roles]
+
+        for role in self.roles:
+            name = role['name']
+            if not isinstance(name, str) or not name:
+                errors.append(f"role without a name: {role.get('invalid', role)}")
+                continue
+            if names.count(name) > 1:
+                errors.append(f"{name}: defined more than once")
+            if name == 'others_cpuset':
+                errors.append("others_cpuset is the housekeeping pool and cannot be a role")
+            if role['hwconfig'] is not None and not (isinstance(role['hwconfig'], tuple) and all(role['hwconfig'])):
+                errors.append(f"{name}: hwconfig must be 'section.key'")
+            if role['cgroup_partition'] not in (None, 'isolated'):
+                errors.append(f"{name}: cgroup_partition must be 'isolated'")
+
+            if role['derive'] is not None:
+                derive = role['derive']
+                if not isinstance(derive, dict) or len(derive) != 1 or next(iter(derive)) not in self.DERIVE_KINDS:
+                    errors.append(f"{name}: derive must be one of {', '.join(self.DERIVE_KINDS)}")
+                    continue
+                kind, sources = next(iter(derive.items()))
+                if kind != 'union' and not isinstance(sources, str):
+                    errors.append(f"{name}: derive {kind} takes a single role name")
+                    continue
+                sources = sources if isinstance(sources, list) else [sources]
+                for source in sources:
+                    if source not in names or self.role(source)['derive'] is not None:
+                        errors.append(f"{name}: derive source {source} is not an allocated role")
+                    elif kind == 'sibling_pairs' and not self.siblings_of(source):
+                        errors.append(f"{name}: sibling_pairs source {source} has no sibling_of role")
+                continue
+
+            if role['sibling_of'] is not None:
+                source = role['sibling_of']
+                if source not in names:
+                    errors.append(f"{name}: sibling_of unknown role {source}")
+                elif self.role(source)['sibling_of'] is not None or self.role(source)['derive'] is not None:
+                    errors.append(f"{name}: sibling_of role {source} must allocate its own pairs")
+                elif self.role(source)['smt'] != 'one' or self.role(source)['pool'] != 'pairs':
+                    errors.append(f"{name}: sibling_of role {source} must use smt: one from the pairs pool")
+                continue
+
+            if role['pool'] not in self.POOLS:
+                errors.append(f"{name}: pool must be one of {', '.join(self.POOLS)}")
+            if not isinstance(role['priority'], int):
+                errors.append(f"{name}: priority must be an integer")
+            if not isinstance(role['rank_priority'], int):
+                errors.append(f"{name}: rank_priority must be an integer")
+            if role['per_device'] is not None:
+                per_device = role['per_device']
+                if not isinstance(per_device, dict) or per_device.get('device') not in self.DEVICES:
+                    errors.append(f"{name}: per_device.device must be one of {', '.join(self.DEVICES)}")
+                elif not isinstance(per_device['ratio'], int) or per_device['ratio'] < 1:
+                    errors.append(f"{name}: per_device.ratio must be a positive integer")
+                elif per_device['order'] not in self.DEVICE_ORDERS:
+                    errors.append(f"{name}: per_device.order must be one of {', '.join(self.DEVICE_ORDERS)}")
+                if role['count'] is not None:
+                    errors.append(f"{name}: use either count or per_device")
+                if role['pool'] != 'pairs':
+                    errors.append(f"{name}: per_device roles allocate from the pairs pool")
+            elif not (role['count'] == 'max_pairs' or (isinstance(role['count'], int) and role['count'] >= 0)):
+                errors.append(f"{name}: count must be a non-negative integer or max_pairs")
+            if role['smt'] not in self.SMT_MODES:
+                errors.append(f"{name}: smt must be one of {', '.join(self.SMT_MODES)}")
+            if role['numa'] not in self.NUMA_MODES:
+                errors.append(f"{name}: numa must be one of {', '.join(self.NUMA_MODES)}")
+            elif role['numa'] == 'device_local' and role['per_device'] is None:
+                errors.append(f"{name}: numa device_local requires per_device")
+            elif role['numa'] != 'device_local' and role['per_device'] is not None:
+                errors.append(f"{name}: per_device roles are always device_local")
+            if role['pool'] == 'housekeeping' and role['count'] == 'max_pairs':
+                errors.append(f"{name}: housekeeping roles need a fixed count")
+
+        return errors
+
+    def role(self, name):
+        for role in self.roles:
+            if role['name'] == name:
+                return role
+        return None
+
+    def allocation_order(self, ranked=False):
+        """Roles that allocate CPUs themselves, by ascending priority
+
+        With ranked cores rank_priority comes first, so latency critical roles
+        pick the fastest cores before the others.
+        """
+        allocated = [r for r in self.roles if r['derive'] is None and r['sibling_of'] is None]
+        if ranked:
+            return sorted(allocated, key=lambda r: (r['rank_priority'], r['priority']))
+        return sorted(allocated, key=lambda r: r['priority'])
+
+    def derived_roles(self):
+        return [r for r in self.roles if r['derive'] is not None]
+
+    def siblings_of(self, name):
+        return [r['name'] for r in self.roles if r['sibling_of'] == name]
+
+    def housekeeping_count(self):
+        """Threads the housekeeping roles need from others_cpuset"""
+        return sum(r['count'] for r in self.roles
+                   if r['derive'] is None and r['pool'] == 'housekeeping' and isinstance(r['count'], int))
+
+    def housekeeping_roles(self):
+        return [r['name'] for r in self.roles if r['pool'] == 'housekeeping']
+    
+    def is_pair_list(self, name):
+        """True for roles holding 't1:t2' strings instead of CPUs"""
+        role = self.role(name)
+        return role is not None and role['derive'] is not None and 'sibling_pairs' in role['derive']
+
+    def cpu_roles(self):
+        """Roles holding CPU lists, in display order"""
+        return [r['name'] for r in self.roles if not self.is_pair_list(r['name'])]
+
+    def cgroup_roles(self):
+        """Roles that get a cgroup of their own, in display order"""
+        return [r['name'] for r in self.roles if r['derive'] is None]
+
+    def isolated_roles(self):
+        return [r['name'] for r in self.roles if r['cgroup_partition'] == 'isolated']
+
+    def numa_mode(self, name):
+        """NUMA affinity of a role, following sibling_of and derive sources"""
+        role = self.role(name)
+        if role['sibling_of'] is not None:
+            return self.numa_mode(role['sibling_of'])
+        if role['derive'] is not None:
+            sources = next(iter(role['derive'].values()))
+            sources = sources if isinstance(sources, list) else [sources]
+            modes = set(self.numa_mode(source) for source in sources)
+            return modes.pop() if len(modes) == 1 else 'any'
+        return role['numa']
+
+
+class CoreMaskGenerator:    
     """Main class for generating core masks"""
     
-    def __init__(self, topology: SystemTopology, max_pairs: int = 32):
+    def __init__(self, topology: SystemTopology, max_pairs: int = 32, policy: RolePolicy = None,
+                 allocation_mode: str = None, use_core_ranking: bool = True):
         self.topology = topology
         self.max_pairs = max_pairs
+        self.policy = policy or RolePolicy.load()
+        self.allocation_mode = allocation_mode or topology.allocation_mode()
+        self.use_core_ranking = use_core_ranking and bool(topology.core_ranking)
         
-        # CPU sets to be generated
-        self.others_cpuset = []
+        # CPU sets to be generated, one per policy role plus the housekeeping pool
+        self.cpusets = {role['name']: [] for role in self.policy.roles}
+        self.cpusets['others_cpuset'] = []
         self.others_reserved = set()  # Track cores reserved for others_cpuset
-        self.cat_cpuset = []
-        self.cat_affine_cpuset = []
-        self.nvmf_cpuset = []
-        self.net_cpuset = []
-        self.handler_cpuset = []
-        self.redfs_cpuset = []
-        self.reds3_cpuset = []
-        self.reds3_sibling_cpuset = []
-        self.posix_cpuset = []
-        self.auxiliary_cpuset = []
-        self.spdk_main_cpuset = []
-        self.etcd_cpuset = []
+        
+        # Thread pairs handed out to smt: one roles, for sibling_pairs
+        self.role_pairs = defaultdict(list)
         
         # Track used cores
         self.used_cores = set()
         
+        # Memory node binding per role, derived from the CPU sets
+        self.memory_bindings = {}
+    
     def generate_masks(self):
-        """Generate all core masks according to specifications"""
+        """Generate all core masks according to the role policy"""
+        if self.allocation_mode == 'core':
+            print("Allocation mode: core (one thread per core, sibling roles get a neighbouring core)")
+        if self.use_core_ranking:
+            print(f"Using preferred core ranking from {self.topology.core_ranking_source}")
+        
         # Step 1: Identify thread pairs and initialize others_cpuset
         self._initialize_others_cpuset()
         
-        # Step 2: Allocate CAT cores
-        self._allocate_cat_cores()
-        
-        # Step 3: Allocate network poller cores
-        self._allocate_network_cores()
+        # Step 2: Allocate roles in priority order
+        housekeeping_started = False
+        for role in self.policy.allocation_order(self.use_core_ranking):
+            if role['pool'] == 'housekeeping':
+                if not housekeeping_started:
+                    available = [c for c in self.cpusets['others_cpuset'] if c not in self.used_cores]
+                    print(f"Available cores in others_cpuset for special functions: {len(available)}")
+                    housekeeping_started = True
+                self._allocate_housekeeping_role(role)
+            elif role['per_device'] is not None:
+                self._allocate_device_role(role)
+            elif role['numa'] == 'balanced':
+                self._allocate_balanced_role(role)
+            else:
+                self._allocate_any_role(role)
         
-        # Step 4: Create handler cpuset
-        self._create_handler_cpuset()
+        # Step 3: Derived sets
+        for role in self.policy.derived_roles():
+            self._derive_role(role)
         
-        # Step 5: Allocate redfs/reds3 cores
-        self._allocate_storage_cores()
+        # Step 4: Update others_cpuset with remaining unused cores
+        self.cpusets['others_cpuset'] = [c for c in self.cpusets['others_cpuset'] if c not in self.used_cores]
         
-        # Step 6: Allocate special function cores
-        self._allocate_special_cores()
+        # Step 5: Derive memory nodes for every role
+        self._derive_memory_bindings()
+    
+    def _thread_pairs(self, numa_id):
+        """Return the (first thread, second thread) pairs of a NUMA node
         
+        With a preferred core ranking the pairs after the first one are ordered
+        fastest first, so roles allocated first (CATs, net pollers) get the
+        best cores and housekeeping takes the slowest ones from the end.
+        """
+        pairs = self.topology.thread_pairs(numa_id, self.allocation_mode)
+        if not self.use_core_ranking:
+            return pairs
+        ranking = self.topology.core_ranking
+        return pairs[:1] + sorted(pairs[1:], key=lambda p: -(ranking.get(p[0], 0) + ranking.get(p[1], 0)))
+    
+    def _pair_is_free(self, t1, t2):
+        return (t1 not in self.used_cores and t2 not in self.used_cores and
+                t1 not in self.others_reserved and t2 not in self.others_reserved)
+    
+    def _take_pair(self, role, pair):
+        """Hand a thread pair to a role and its sibling roles"""
+        t1, t2 = pair
+        self.used_cores.add(t1)
+        self.used_cores.add(t2)
+        if role['smt'] == 'pair':
+            self.cpusets[role['name']].extend([t1, t2])
+        else:
+            self.cpusets[role['name']].append(t1)
+            self.role_pairs[role['name']].append(pair)
+            for sibling in self.policy.siblings_of(role['name']):
+                self.cpusets[sibling].append(t2)
+    
+    def _role_count(self, role):
+        return self.max_pairs if role['count'] == 'max_pairs' else role['count']
+    
     def _initialize_others_cpuset(self):
         """Initialize others_cpuset with second thread of first core from each NUMA (except core 0)"""
         # Based on the example:
         # "First we always ignore first thread pair on all cores, it can never be assigned to anybody.
         # This means 0,128 , 16,144 , 32,160,48,176,64,192,80,208,96,224,112,240 will not be used first
         # We ignore core 0 completely but put the rest of the cores into a others_cpuset variable"
+        #
+        # In core mode a pair is two physical cores, so both go to others_cpuset
+        # except core 0, which stays unassigned as with SMT.
+        others = self.cpusets['others_cpuset']
+        core_mode = self.allocation_mode == 'core'
         
-        for numa_id, cpus in sorted(self.topology.numa_nodes.items()):
-            if not cpus:
-                continue
-                
-            # Assuming SMT/HT, split CPUs into two groups
-            mid = len(cpus) // 2
-            first_threads = cpus[:mid]
-            second_threads = cpus[mid:]
+        for numa_id in sorted(self.topology.numa_nodes):
+            pairs = self._thread_pairs(numa_id)
             
             # Get first core of this NUMA
-            if len(first_threads) > 0 and len(second_threads) > 0:
-                first_core_t1 = first_threads[0]
-                first_core_t2 = second_threads[0]
+            if pairs:
+                first_core_t1, first_core_t2 = pairs[0]
                 
-                if first_core_t1 == 0:
+                if core_mode:
+                    if first_core_t1 == 0:
+                        self.used_cores.add(first_core_t1)
+                    else:
+                        others.append(first_core_t1)
+                    others.append(first_core_t2)
+                elif first_core_t1 == 0:
                     # This is core 0, skip it completely
                     self.used_cores.add(first_core_t1)
                     self.used_cores.add(first_core_t2)
                 else:
                     # Add second thread of first core to others_cpuset
-                    self.others_cpuset.append(first_core_t2)
+                    others.append(first_core_t2)
         
-        print(f"Initial others_cpuset: {sorted(self.others_cpuset)}")
-        print(f"Initial others_cpuset has {len(self.others_cpuset)} cores available")
+        print(f"Initial others_cpuset: {sorted(others)}")
+        print(f"Initial others_cpuset has {len(others)} cores available")
         
         # Reserve all others_cpuset cores so they won't be used elsewhere
-        self.others_reserved = set(self.others_cpuset)
+        self.others_reserved = set(others)
         
         # If we don't have enough cores in others_cpuset, we need to add more
-        # We need at least 8 cores (2 posix + 1 auxiliary + 1 spdk_main + 4 etcd)
-        min_required = 8
-        if len(self.others_cpuset) < min_required:
-            print(f"Warning: Only {len(self.others_cpuset)} cores in others_cpuset, need {min_required}")
+        # for the housekeeping roles of the policy
+        min_required = self.policy.housekeeping_count()
+        if len(others) < min_required:
+            print(f"Warning: Only {len(others)} cores in others_cpuset, need {min_required}")
             print("Adding additional cores from unused cores...")
             
             # Try to add more cores from first threads of unused pairs
             # Start from the last cores which are less likely to be needed
-            for numa_id, cpus in sorted(self.topology.numa_nodes.items(), reverse=True):
-                if len(self.others_cpuset) >= min_required:
+            for numa_id in sorted(self.topology.numa_nodes, reverse=True):
+                if len(others) >= min_required:
                     break
-                    
-                mid = len(cpus) // 2
-                first_threads = cpus[:mid]
-                second_threads = cpus[mid:]
+                
+                pairs = self._thread_pairs(numa_id)
                 
                 # Try cores starting from the end
-                for i in range(len(first_threads) - 1, 0, -1):  # Skip first core
-                    if len(self.others_cpuset) >= min_required:
+                for t1, t2 in reversed(pairs[1:]):  # Skip first core
+                    if len(others) >= min_required:
                         break
-                        
-                    t1 = first_threads[i]
-                    t2 = second_threads[i]
                     
                     # Check if either thread is already reserved
-                    if (t1 not in self.used_cores and t2 not in self.used_cores and 
-                        t1 not in self.others_reserved and t2 not in self.others_reserved):
+                    if self._pair_is_free(t1, t2) and core_mode:
+                        # Both cores of the pair are usable
+                        others.extend([t1, t2])
+                        self.others_reserved.add(t1)
+                        self.others_reserved.add(t2)
+                        print(f"Added cores {t1},{t2} from NUMA {numa_id} to others_cpuset")
+                    elif self._pair_is_free(t1, t2):
                         # Add first thread to others_cpuset and reserve both
-                        self.others_cpuset.append(t1)
+                        others.append(t1)
                         self.others_reserved.add(t1)
                         self.others_reserved.add(t2)  # Reserve the pair
                         print(f"Added core {t1} from NUMA {numa_id} to others_cpuset (reserving pair {t1},{t2})")
             
-            print(f"Updated others_cpuset: {sorted(self.others_cpuset)}")
-            print(f"Updated others_cpuset has {len(self.others_cpuset)} cores available")
-    
-    def _allocate_cat_cores(self):
-        """Allocate cores for CAT devices"""
-        # Group CATs by NUMA node
-        cats_by_numa = defaultdict(list)
-        for i, device in enumerate(self.topology.nvme_devices):
-            cats_by_numa[device['numa_node']].append(f"Cat{i}: {device['name']}")
-        
-        # Check 1/3 core limit
-        max_cat_cores = self.topology.total_cores // 3
-        total_cats = len(self.topology.nvme_devices)
-        
-        if total_cats > max_cat_cores:
-            print(f"Warning: {total_cats} CATs exceed 1/3 core limit ({max_cat_cores})")
-        
-        # Allocate cores for each NUMA domain
-        for numa_id, cats in sorted(cats_by_numa.items()):
-            cpus = self.topology.numa_nodes.get(numa_id, [])
-            if not cpus:
-                continue
-                
-            # Get thread pairs for this NUMA
-            mid = len(cpus) // 2
-            first_threads = cpus[:mid]
-            second_threads = cpus[mid:]
-            
-            # Skip first pair and already used cores
-            core_idx = 1  # Start from second core
-            for cat in cats:
-                while core_idx < len(first_threads):
-                    t1 = first_threads[core_idx]
-                    t2 = second_threads[core_idx]
-                    
-                    if (t1 not in self.used_cores and t2 not in self.used_cores and
-                        t1 not in self.others_reserved and t2 not in self.others_reserved):
-                        self.cat_cpuset.append(t1)
-                        self.cat_affine_cpuset.append(t2)
-                        self.used_cores.add(t1)
-                        self.used_cores.add(t2)
-                        break
-                    
-                    core_idx += 1
-                
-        # nvmf_cpuset equals cat_affine_cpuset
-        self.nvmf_cpuset = self.cat_affine_cpuset.copy()
+            print(f"Updated others_cpuset: {sorted(others)}")
+            print(f"Updated others_cpuset has {len(others)} cores available")
     
-    def _allocate_network_cores(self):
-        """Allocate cores for network pollers (2 per Mellanox adapter)"""
-        for adapter in self.topology.mellanox_adapters:
-            numa_id = adapter['numa_node']
-            cpus = self.topology.numa_nodes.get(numa_id, [])
-            if not cpus:
-                continue
-                
-            # Get thread pairs for this NUMA
-            mid = len(cpus) // 2
-            first_threads = cpus[:mid]
-            second_threads = cpus[mid:]
+    def _allocate_device_role(self, role):
+        """Allocate thread pairs local to each device of a per_device role"""
+        per_device = role['per_device']
+        devices = getattr(self.topology, RolePolicy.DEVICES[per_device['device']])
+        
+        if per_device['device'] == 'nvme':
+            # Check 1/3 core limit
+            max_cat_cores = self.topology.total_cores // 3
+            total_cats = len(devices)
             
-            # Allocate 2 pollers per adapter
-            allocated = 0
-            core_idx = 1  # Start from second core
+            if total_cats > max_cat_cores:
+                print(f"Warning: {total_cats} CATs exceed 1/3 core limit ({max_cat_cores})")
+        
+        if per_device['order'] == 'numa':
+            devices = sorted(devices, key=lambda d: d['numa_node'])
+        
+        for device in devices:
+            pairs = self._thread_pairs(device['numa_node'])
             
-            while allocated < 2 and core_idx < len(first_threads):
-                t1 = first_threads[core_idx]
-                t2 = second_threads[core_idx]
-                
-                if (t1 not in self.used_cores and t2 not in self.used_cores and
-                    t1 not in self.others_reserved and t2 not in self.others_reserved):
-                    # Use both threads of the pair for network polling
-                    self.net_cpuset.extend([t1, t2])
-                    self.used_cores.add(t1)
-                    self.used_cores.add(t2)
+            # Skip first pair and already used cores
+            allocated = 0
+            for pair in pairs[1:]:
+                if allocated >= per_device['ratio']:
+                    break
+                if self._pair_is_free(*pair):
+                    self._take_pair(role, pair)
                     allocated += 1
-                
-                core_idx += 1
-    
-    def _create_handler_cpuset(self):
-        """Create handler cpuset from cat, cat_affine, and net cpusets"""
-        self.handler_cpuset = sorted(set(
-            self.cat_cpuset + self.cat_affine_cpuset + self.net_cpuset
-        ))
+            
+            # With SNC/NPS a small sub-NUMA node runs out first, spill to the
+            # nearest node of the same socket instead of dropping the device
+            for numa_id in self.topology.same_socket_nodes(device['numa_node']):
+                for pair in self._thread_pairs(numa_id)[1:]:
+                    if allocated >= per_device['ratio']:
+                        break
+                    if self._pair_is_free(*pair):
+                        self._take_pair(role, pair)
+                        allocated += 1
+                        print(f"{role['name']}: {device.get('name', device['pci'])} uses NUMA {numa_id} "
+                              f"(NUMA {device['numa_node']} is full)")
     
-    def _allocate_storage_cores(self):
-        """Allocate cores for redfs and reds3"""
+    def _allocate_balanced_role(self, role):
+        """Allocate thread pairs balanced across NUMA domains"""
+        count = self._role_count(role)
+        
         # Create free pair list for each NUMA domain
         free_pairs_by_numa = defaultdict(list)
-        
-        for numa_id, cpus in sorted(self.topology.numa_nodes.items()):
-            if not cpus:
-                continue
-                
-            mid = len(cpus) // 2
-            first_threads = cpus[:mid]
-            second_threads = cpus[mid:]
-            
+        for numa_id in sorted(self.topology.numa_nodes):
             # Find free pairs (skip first pair)
-            for i in range(1, len(first_threads)):
-                t1 = first_threads[i]
-                t2 = second_threads[i]
-                
-                if (t1 not in self.used_cores and t2 not in self.used_cores and
-                    t1 not in self.others_reserved and t2 not in self.others_reserved):
-                    free_pairs_by_numa[numa_id].append((t1, t2))
+            for pair in self._thread_pairs(numa_id)[1:]:
+                if self._pair_is_free(*pair):
+                    free_pairs_by_numa[numa_id].append(pair)
         
         # Balance pairs across NUMA domains
-        allocated_pairs = []
+        allocated = 0
+        sockets = self.topology.sub_numa_domains()
+        while sockets and allocated < count:
+            # With SNC/NPS balance the sockets first, then their sub-NUMA nodes
+            socket_counts = [(socket, sum(len(free_pairs_by_numa[n]) for n in nodes))
+                             for socket, nodes in sorted(sockets.items())]
+            socket_counts = [x for x in socket_counts if x[1]]
+            if not socket_counts:
+                break
+            socket_counts.sort(key=lambda x: x[1], reverse=True)
+            
+            for socket, _ in socket_counts:
+                if allocated >= count:
+                    break
+                nodes = [n for n in sockets[socket] if free_pairs_by_numa[n]]
+                numa_id = max(nodes, key=lambda n: len(free_pairs_by_numa[n]))
+                self._take_pair(role, free_pairs_by_numa[numa_id].pop(0))
+                allocated += 1
         
-        while len(allocated_pairs) < self.max_pairs:
+        while allocated < count:
             # Find NUMA domains with most free pairs
             numa_counts = [(numa, len(pairs)) for numa, pairs in free_pairs_by_numa.items() if pairs]
             if not numa_counts:
                 break
-                
+            
             # Sort by number of free pairs (descending)
             numa_counts.sort(key=lambda x: x[1], reverse=True)
             
             # Take from NUMA domains with most pairs
             for numa_id, _ in numa_counts:
-                if len(allocated_pairs) >= self.max_pairs:
+                if allocated >= count:
                     break
-                    
+                
                 if free_pairs_by_numa[numa_id]:
-                    pair = free_pairs_by_numa[numa_id].pop(0)
-                    allocated_pairs.append(pair)
-                    self.used_cores.add(pair[0])
-                    self.used_cores.add(pair[1])
-        
-        # Assign to redfs and reds3
-        for t1, t2 in allocated_pairs:
-            self.reds3_cpuset.append(t1)
-            self.redfs_cpuset.append(t2)
-            self.reds3_sibling_cpuset.append(f"{t1}:{t2}")
-    
-    def _allocate_special_cores(self):
-        """Allocate cores for special functions from others_cpuset"""
-        available_others = [c for c in self.others_cpuset if c not in self.used_cores]
-        
-        print(f"Available cores in others_cpuset for special functions: {len(available_others)}")
-        
-        # Allocate in order
-        if len(available_others) >= 2:
-            self.posix_cpuset = available_others[:2]
-            available_others = available_others[2:]
-            for c in self.posix_cpuset:
-                self.used_cores.add(c)
-        else:
-            print("Warning: Not enough cores for posix_cpuset")
+                    self._take_pair(role, free_pairs_by_numa[numa_id].pop(0))
+                    allocated += 1
+    
+    def _allocate_any_role(self, role):
+        """Allocate the first free thread pairs in NUMA order"""
+        count = self._role_count(role)
+        allocated = 0
+        for numa_id in sorted(self.topology.numa_nodes):
+            for pair in self._thread_pairs(numa_id)[1:]:
+                if allocated >= count:
+                    return
+                if self._pair_is_free(*pair):
+                    self._take_pair(role, pair)
+                    allocated += 1
+    
+    def _allocate_housekeeping_role(self, role):
+        """Allocate single threads for a role from others_cpuset"""
+        name = role['name']
+        count = role['count']
+        available = [c for c in self.cpusets['others_cpuset'] if c not in self.used_cores]
         
-        if len(available_others) >= 1:
-            self.auxiliary_cpuset = available_others[:1]
-            available_others = available_others[1:]
-            for c in self.auxiliary_cpuset:
-                self.used_cores.add(c)
+        if len(available) >= count:
+            taken = available[:count]
+        elif role['partial']:
+            print(f"Warning: Not enough cores for {name} (need {count}, have {len(available)})")
+            taken = available
         else:
-            print("Warning: Not enough cores for auxiliary_cpuset")
+            print(f"Warning: Not enough cores for {name}")
+            taken = []
         
-        if len(available_others) >= 1:
-            self.spdk_main_cpuset = available_others[:1]
-            available_others = available_others[1:]
-            for c in self.spdk_main_cpuset:
+        if taken:
+            self.cpusets[name] = taken
+            for c in taken:
                 self.used_cores.add(c)
-        else:
-            print("Warning: Not enough cores for spdk_main_cpuset")
+    
+    def _derive_role(self, role):
+        """Build a role from the CPU sets of other roles"""
+        kind, sources = next(iter(role['derive'].items()))
+        if kind == 'copy':
+            self.cpusets[role['name']] = self.cpusets[sources].copy()
+        elif kind == 'union':
+            self.cpusets[role['name']] = sorted(set(c for source in sources for c in self.cpusets[source]))
+        elif kind == 'sibling_pairs':
+            self.cpusets[role['name']] = [f"{t1}:{t2}" for t1, t2 in self.role_pairs[sources]]
+    
+    def _derive_memory_bindings(self):
+        """Derive the memory node set and policy of each role from its CPUs
         
-        if len(available_others) >= 4:
-            self.etcd_cpuset = available_others[:4]
-            available_others = available_others[4:]
-            for c in self.etcd_cpuset:
-                self.used_cores.add(c)
-        else:
-            print(f"Warning: Not enough cores for etcd_cpuset (need 4, have {len(available_others)})")
-            if available_others:
-                self.etcd_cpuset = available_others
-                available_others = []
-                for c in self.etcd_cpuset:
-                    self.used_cores.add(c)
+        Roles on a single NUMA node bind to it, everything else interleaves
+        except per-device pollers spread across nodes: each of their CPUs binds
+        to its own node, so they get one membind per node (node_bindings) and
+        a per-CPU node list (cpu_mems) instead of a single numactl command.
+        """
+        cpu_to_numa = {}
+        for numa_id, cpus in self.topology.numa_nodes.items():
+            for cpu in cpus:
+                cpu_to_numa[cpu] = numa_id
+        smallest_node = min((len(cpus) for cpus in self.topology.numa_nodes.values() if cpus), default=0)
         
-        # Update others_cpuset with remaining unused cores
-        self.others_cpuset = available_others
+        self.memory_bindings = {}
+        for role in self.policy.cpu_roles() + ['others_cpuset']:
+            cpus = self.cpusets[role]
+            if not cpus:
+                continue
+            
+            # others_cpuset is spread over all NUMA nodes by construction
+            numa_mode = 'balanced' if role == 'others_cpuset' else self.policy.numa_mode(role)
+            mems = sorted(set(cpu_to_numa[c] for c in cpus if c in cpu_to_numa))
+            physcpubind = self._format_cpu_list(sorted(cpus))
+            mems_str = self._format_cpu_list(mems)
+            
+            if len(mems) == 1:
+                policy = 'bind'
+                numactl = f"numactl --membind={mems_str} --physcpubind={physcpubind}"
+            elif numa_mode == 'device_local':
+                policy = 'local'
+                numactl = None
+            else:
+                policy = 'interleave'
+                numactl = f"numactl --interleave={mems_str} --physcpubind={physcpubind}"
+            
+            # Small roles that would fit on one node gain nothing from spanning several.
+            # Housekeeping roles take what others_cpuset has on any node, the policy
+            # has no NUMA placement for them, so they are not flagged.
+            housekeeping = role in self.policy.housekeeping_roles()
+            spans_unnecessarily = (len(mems) > 1 and numa_mode not in ('device_local', 'balanced') and
+                                   not housekeeping and len(cpus) <= smallest_node)
+            if spans_unnecessarily:
+                print(f"Warning: {role} spans NUMA nodes {mems_str} but fits on a single node")
+            
+            node_bindings = []
+            if policy == 'local':
+                for numa_id in mems:
+                    node_cpus = self._format_cpu_list(sorted(c for c in cpus if cpu_to_numa.get(c) == numa_id))
+                    node_bindings.append({
+                        'numa_node': numa_id,
+                        'cpus': node_cpus,
+                        'numactl': f"numactl --membind={numa_id} --physcpubind={node_cpus}"
+                    })
+            
+            self.memory_bindings[role] = {
+                'mems': mems,
+                'cpu_mems': {cpu: cpu_to_numa.get(cpu) for cpu in cpus},
+                'policy': policy,
+                'cpuset_mems': mems_str,
+                'numactl': numactl,
+                'node_bindings': node_bindings,
+                'spans_numa_unnecessarily': spans_unnecessarily
+            }
+    
+    def role_ranks(self):
+        """Mean preferred core rank per role, empty without a ranking"""
+        ranking = self.topology.core_ranking
+        if not self.use_core_ranking:
+            return {}
+        ranks = {}
+        for role in self.policy.cpu_roles() + ['others_cpuset']:
+            cpus = [c for c in self.cpusets[role] if c in ranking]
+            if cpus:
+                ranks[role] = round(sum(ranking[c] for c in cpus) / len(cpus), 1)
+        return ranks
+    
+    def polling_tuning(self):
+        """Recommended governor and EPP for the polling (isolated) roles
+        
+        Returns None when the cpufreq settings are unknown.
+        """
+        cpufreq = self.topology.cpufreq
+        cpus = sorted(set(c for role in self.policy.isolated_roles() for c in self.cpusets[role]))
+        cpus = [c for c in cpus if c in cpufreq]
+        if not cpus:
+            return None
+        
+        governor_cpus = [c for c in cpus if cpufreq[c]['governor'] != 'performance']
+        epp_cpus = [c for c in cpus if cpufreq[c]['epp'] not in (None, 'performance')]
+        commands = []
+        if governor_cpus:
+            commands.append(f"cpupower -c {_format_cpulist_value(governor_cpus)} frequency-set -g performance")
+        if epp_cpus:
+            commands.append(f"for c in {' '.join(map(str, epp_cpus))}; do "
+                            f"echo performance > /sys/devices/system/cpu/cpu$c/cpufreq/energy_performance_preference; done")
+        return {
+            'cpus': _format_cpulist_value(cpus),
+            'governor': 'performance',
+            'epp': 'performance',
+            'current_governors': sorted(set(cpufreq[c]['governor'] for c in cpus)),
+            'current_epp': sorted(set(cpufreq[c]['epp'] for c in cpus if cpufreq[c]['epp'] is not None)),
+            'commands': commands
+        }
     
     def print_results(self, file=sys.stdout):
         """Print all generated CPU sets"""
         print("\n=== SYSTEM TOPOLOGY ===", file=file)
         print(f"Total cores: {self.topology.total_cores}", file=file)
         print(f"Total threads: {self.topology.total_threads}", file=file)
+        if self.allocation_mode == 'core':
+            print(f"Allocation mode: core ({self.topology.threads_per_core} thread(s) per core, "
+                  f"pairs are neighbouring cores)", file=file)
         print(f"NUMA nodes: {len(self.topology.numa_nodes)}", file=file)
         
         print("\n=== NUMA TOPOLOGY ===", file=file)
         for numa_id, cpus in sorted(self.topology.numa_nodes.items()):
             print(f"NUMA node{numa_id} CPU(s): {self._format_cpu_list(cpus)}", file=file)
+        for numa_id in self.topology.memory_only_nodes:
+            print(f"NUMA node{numa_id} CPU(s): none (memory only)", file=file)
         
         print("\n=== DEVICES ===", file=file)
         print(f"NVMe devices found: {len(self.topology.nvme_devices)}", file=file)
         for device in self.topology.nvme_devices:
-            print(f"  {device['name']}: NUMA node {device['numa_node']}", file=file)
+            print(f"  {device['name']}: NUMA node {device['numa_node']}{self._memory_node_note(device)}", file=file)
         
         print(f"\nMellanox adapters found: {len(self.topology.mellanox_adapters)}", file=file)
         for adapter in self.topology.mellanox_adapters:
-            print(f"  PCI {adapter['pci']}: NUMA node {adapter['numa_node']}", file=file)
+            print(f"  PCI {adapter['pci']}: NUMA node {adapter['numa_node']}{self._memory_node_note(adapter)}", file=file)
         
         print("\n=== GENERATED CPU SETS ===", file=file)
-        print(f"cat_cpuset: {self._format_cpu_list(self.cat_cpuset)}", file=file)
-        print(f"cat_affine_cpuset: {self._format_cpu_list(self.cat_affine_cpuset)}", file=file)
-        print(f"nvmf_cpuset: {self._format_cpu_list(self.nvmf_cpuset)}", file=file)
-        print(f"net_cpuset: {self._format_cpu_list(self.net_cpuset)}", file=file)
-        print(f"handler_cpuset: {self._format_cpu_list(self.handler_cpuset)}", file=file)
-        print(f"redfs_cpuset: {self._format_cpu_list(self.redfs_cpuset)}", file=file)
-        print(f"reds3_cpuset: {self._format_cpu_list(self.reds3_cpuset)}", file=file)
-        print(f"reds3_sibling_cpuset: {','.join(self.reds3_sibling_cpuset)}", file=file)
-        print(f"posix_cpuset: {self._format_cpu_list(self.posix_cpuset)}", file=file)
-        print(f"auxiliary_cpuset: {self._format_cpu_list(self.auxiliary_cpuset)}", file=file)
-        print(f"spdk_main_cpuset: {self._format_cpu_list(self.spdk_main_cpuset)}", file=file)
-        print(f"etcd_cpuset: {self._format_cpu_list(self.etcd_cpuset)}", file=file)
-        print(f"others_cpuset (remaining): {self._format_cpu_list(self.others_cpuset)}", file=file)
+        for role in self.policy.roles:
+            name = role['name']
+            if self.policy.is_pair_list(name):
+                print(f"{name}: {','.join(self.cpusets[name])}", file=file)
+            else:
+                print(f"{name}: {self._format_cpu_list(self.cpusets[name])}", file=file)
+        print(f"others_cpuset (remaining): {self._format_cpu_list(self.cpusets['others_cpuset'])}", file=file)
+        
+        print("\n=== MEMORY BINDING ===", file=file)
+        for role, binding in self.memory_bindings.items():
+            flag = " (spans NUMA unnecessarily)" if binding['spans_numa_unnecessarily'] else ""
+            print(f"{role}: mems {binding['cpuset_mems']} {binding['policy']}{flag}", file=file)
+            if binding['numactl']:
+                print(f"  {binding['numactl']}", file=file)
+            for node in binding['node_bindings']:
+                print(f"  {node['numactl']}", file=file)
+        
+        role_ranks = self.role_ranks()
+        if role_ranks:
+            ranking = self.topology.core_ranking
+            itmt = {True: ", ITMT enabled", False: ", ITMT disabled", None: ""}[self.topology.itmt_enabled]
+            print("\n=== PREFERRED CORES ===", file=file)
+            print(f"Ranking: {self.topology.core_ranking_source} "
+                  f"(min {min(ranking.values())}, max {max(ranking.values())}{itmt})", file=file)
+            for role, rank in role_ranks.items():
+                print(f"{role}: mean rank {rank}", file=file)
+        
+        tuning = self.polling_tuning()
+        if tuning:
+            print("\n=== POLLING CORE TUNING ===", file=file)
+            print(f"Polling CPUs: {tuning['cpus']}", file=file)
+            print(f"Current governor: {','.join(tuning['current_governors'])}, "
+                  f"EPP: {','.join(tuning['current_epp']) or 'n/a'}", file=file)
+            if tuning['commands']:
+                print(f"Recommended: governor {tuning['governor']}, EPP {tuning['epp']}", file=file)
+                for command in tuning['commands']:
+                    print(f"  {command}", file=file)
+            else:
+                print("Governor and EPP are already set to performance", file=file)
+    
+    def _memory_node_note(self, device):
+        if 'mem_numa_node' not in device:
+            return ""
+        return f" (attached to CPU-less node {device['mem_numa_node']})"
     
     def export_json(self, filename):
         """Export results to JSON file"""
@@ -545,26 +1201,31 @@ class CoreMaskGenerator:
             'topology': {
                 'total_cores': self.topology.total_cores,
                 'total_threads': self.topology.total_threads,
+                'threads_per_core': self.topology.threads_per_core,
                 'numa_nodes': {str(k): v for k, v in self.topology.numa_nodes.items()},
+                'memory_only_nodes': self.topology.memory_only_nodes,
+                'numa_distances': {str(k): {str(n): d for n, d in v.items()}
+                                   for k, v in self.topology.numa_distances.items()},
+                'node_sockets': {str(k): v for k, v in self.topology.node_sockets.items()},
                 'nvme_devices': self.topology.nvme_devices,
                 'mellanox_adapters': self.topology.mellanox_adapters
             },
-            'cpu_sets': {
-                'cat_cpuset': self.cat_cpuset,
-                'cat_affine_cpuset': self.cat_affine_cpuset,
-                'nvmf_cpuset': self.nvmf_cpuset,
-                'net_cpuset': self.net_cpuset,
-                'handler_cpuset': self.handler_cpuset,
-                'redfs_cpuset': self.redfs_cpuset,
-                'reds3_cpuset': self.reds3_cpuset,
-                'reds3_sibling_cpuset': self.reds3_sibling_cpuset,
-                'posix_cpuset': self.posix_cpuset,
-                'auxiliary_cpuset': self.auxiliary_cpuset,
-                'spdk_main_cpuset': self.spdk_main_cpuset,
-                'etcd_cpuset': self.etcd_cpuset,
-                'others_cpuset': self.others_cpuset
-            }
+            'allocation_mode': self.allocation_mode,
+            'cpu_sets': self.cpusets,
+            'derived_roles': [role['name'] for role in self.policy.derived_roles()],
+            'housekeeping_roles': ['others_cpuset'] + self.policy.housekeeping_roles(),
+            'memory_bindings': self.memory_bindings
         }
+        if self.use_core_ranking:
+            results['core_ranking'] = {
+                'source': self.topology.core_ranking_source,
+                'itmt_enabled': self.topology.itmt_enabled,
+                'ranks': {str(k): v for k, v in sorted(self.topology.core_ranking.items())},
+                'role_mean_rank': self.role_ranks()
+            }
+        tuning = self.polling_tuning()
+        if tuning:
+            results['polling_tuning'] = tuning
         
         with open(filename, 'w') as f:
             json.dump(results, f, indent=2)
@@ -637,6 +1298,68 @@ def _format_cpulist_value(cpus):
     return QuotedStr(cpu_str)
 
 
+def _format_mems_value(generator, role):
+    """Format the memory node set of a role for hwconfig files"""
+    binding = generator.memory_bindings.get(role)
+    if not binding:
+        return ""
+
+    # Return as QuotedStr to force double quotes in YAML
+    return QuotedStr(binding['cpuset_mems'])
+
+
+def _format_cpu_mems_value(generator, role):
+    """Format the memory node of every CPU of a role, in cpuset order, for hwconfig files"""
+    binding = generator.memory_bindings[role]
+    return QuotedStr(','.join(str(binding['cpu_mems'][cpu]) for cpu in generator.cpusets[role]))
+
+
+# Placeholder for a role value in the hwconfig layout, filled from the role policy
+_ROLE_SLOT = object()
+
+
+def _hwconfig_role_values(generator):
+    """Map (section, key) to the formatted value of every policy role with a hwconfig key"""
+    values = {}
+    for role in generator.policy.roles:
+        if role['hwconfig'] is None:
+            continue
+        section, key = role['hwconfig']
+        name = role['name']
+        if generator.policy.is_pair_list(name):
+            values[(section, key)] = QuotedStr(",".join(generator.cpusets[name]))
+        else:
+            values[(section, key)] = _format_cpuset_value(generator.cpusets[name])
+            values[(section, f"{key}_mems")] = _format_mems_value(generator, name)
+            binding = generator.memory_bindings.get(name)
+            if binding and binding['policy'] == 'local':
+                values[(section, f"{key}_cpu_mems")] = _format_cpu_mems_value(generator, name)
+    return values
+
+
+def _fill_role_slots(config, values):
+    """Replace role slots with policy values, drop unmapped slots and append new keys"""
+    for section, entries in config.items():
+        resources = entries.get('resources')
+        if resources is None:
+            continue
+        filled = {}
+        for key, value in resources.items():
+            if value is not _ROLE_SLOT:
+                filled[key] = value
+            elif (section, key) in values:
+                filled[key] = values.pop((section, key))
+                # Per-CPU memory nodes follow the memory node set of their role
+                cpu_mems_key = f"{key[:-len('_mems')]}_cpu_mems"
+                if key.endswith('_mems') and (section, cpu_mems_key) in values:
+                    filled[cpu_mems_key] = values.pop((section, cpu_mems_key))
+        entries['resources'] = filled
+
+    # Keys the default layout does not know about go to the end of their section
+    for (section, key), value in values.items():
+        config.setdefault(section, {}).setdefault('resources', {})[key] = value
+
+
 def generate_hwconfig(topology, generator, hwmodel, summary, comments):
     """Generate a configuration in the hwconfig-files format"""
     # Create the basic structure
@@ -656,15 +1379,18 @@ def generate_hwconfig(topology, generator, hwmodel, summary, comments):
         },
         'etcd': {
             'resources': {
-                'cpuset': _format_cpuset_value(generator.etcd_cpuset),
+                'cpuset': _ROLE_SLOT,
+                'cpuset_mems': _ROLE_SLOT,
                 'mem_limit': 8192
             }
         },
         'reds3': {
             'resources': {
-                'redfs_cpuset': _format_cpuset_value(generator.redfs_cpuset),
-                'reds3_cpuset': _format_cpuset_value(generator.reds3_cpuset),
-                'reds3_sibling_cpuset': QuotedStr(",".join(generator.reds3_sibling_cpuset)),
+                'redfs_cpuset': _ROLE_SLOT,
+                'redfs_cpuset_mems': _ROLE_SLOT,
+                'reds3_cpuset': _ROLE_SLOT,
+                'reds3_cpuset_mems': _ROLE_SLOT,
+                'reds3_sibling_cpuset': _ROLE_SLOT,
                 'mem_limit': 55320
             },
             'environment': {
@@ -677,14 +1403,22 @@ def generate_hwconfig(topology, generator, hwmodel, summary, comments):
         'redagent': {
             'resources': {
                 'mem_limit': 55320,
-                'cat_cpuset': _format_cpuset_value(generator.cat_cpuset),
-                'cat_affine_cpuset': _format_cpuset_value(generator.cat_affine_cpuset),
-                'handler_cpuset': _format_cpuset_value(generator.handler_cpuset),
-                'net_cpuset': _format_cpuset_value(generator.net_cpuset),
-                'nvmf_cpuset': _format_cpuset_value(generator.nvmf_cpuset),
-                'posix_cpuset': _format_cpuset_value(generator.posix_cpuset),
-                'auxiliary_cpuset': _format_cpuset_value(generator.auxiliary_cpuset),
-                'spdk_main_cpuset': _format_cpuset_value(generator.spdk_main_cpuset)
+                'cat_cpuset': _ROLE_SLOT,
+                'cat_cpuset_mems': _ROLE_SLOT,
+                'cat_affine_cpuset': _ROLE_SLOT,
+                'cat_affine_cpuset_mems': _ROLE_SLOT,
+                'handler_cpuset': _ROLE_SLOT,
+                'handler_cpuset_mems': _ROLE_SLOT,
+                'net_cpuset': _ROLE_SLOT,
+                'net_cpuset_mems': _ROLE_SLOT,
+                'nvmf_cpuset': _ROLE_SLOT,
+                'nvmf_cpuset_mems': _ROLE_SLOT,
+                'posix_cpuset': _ROLE_SLOT,
+                'posix_cpuset_mems': _ROLE_SLOT,
+                'auxiliary_cpuset': _ROLE_SLOT,
+                'auxiliary_cpuset_mems': _ROLE_SLOT,
+                'spdk_main_cpuset': _ROLE_SLOT,
+                'spdk_main_cpuset_mems': _ROLE_SLOT
             },
             'environment': {
                 'JE_MALLOC_CONF': 'prof:true,prof_active:false'
@@ -708,6 +1442,8 @@ def generate_hwconfig(topology, generator, hwmodel, summary, comments):
         }
     }
 
+    _fill_role_slots(config, _hwconfig_role_values(generator))
+
     # Add NUMA node information
     for numa_id, cpus in sorted(topology.numa_nodes.items()):
         config['description']['node']['numa_cpu_list'].append({
@@ -718,6 +1454,564 @@ def generate_hwconfig(topology, generator, hwmodel, summary, comments):
     return config
 
 
+class CgroupCpusetApplier:
+    """Applies generated CPU sets directly to a cgroup v2 hierarchy
+
+    Polling roles become isolated partitions under a small partition root of
+    their own directly below the cgroup root, so only their CPUs leave the
+    root cgroup. All other roles are member cgroups under the parent slice.
+    Processes are only moved for the --cgroup-attach targets. All writes and
+    moves are journaled and undone in reverse order if any step fails.
+    """
+
+    def __init__(self, generator: CoreMaskGenerator, cgroup_root: str = '/sys/fs/cgroup',
+                 parent: str = 'red.slice', poll_parent: str = 'red-poll.slice',
+                 attach: List[str] = None, proc_root: str = '/proc'):
+        self.generator = generator
+        self.cgroup_root = cgroup_root
+        self.parent = parent.strip('/')
+        self.proc_root = proc_root
+        self.journal = []  # (action, path, previous value)
+
+        # Polling roles that get an isolated partition, none without a partition parent
+        if poll_parent and poll_parent != 'none':
+            self.poll_parent = poll_parent.strip('/')
+            self.isolated_roles = generator.policy.isolated_roles()
+        else:
+            self.poll_parent = None
+            self.isolated_roles = []
+
+        # ROLE=CONTAINER|PID targets, resolved to PIDs by validate()
+        self.attach = [a.split('=', 1) for a in attach or []]
+        self.attach_pids = {}
+
+    def build_plan(self) -> Dict[str, List[int]]:
+        """Return {role: cpus} for every non-empty, non-derived role"""
+        plan = {}
+        for role in self.generator.policy.cgroup_roles() + ['others_cpuset']:
+            cpus = self.generator.cpusets[role]
+            if cpus:
+                plan[role] = sorted(cpus)
+        return plan
+
+    def validate(self, plan) -> List[str]:
+        """Check the whole plan before touching the hierarchy"""
+        errors = []
+
+        controllers = self._read(os.path.join(self.cgroup_root, 'cgroup.controllers'))
+        if controllers is None:
+            errors.append(f"{self.cgroup_root} is not a cgroup v2 hierarchy (no cgroup.controllers)")
+        elif 'cpuset' not in controllers.split():
+            errors.append(f"cpuset controller not available in {self.cgroup_root}")
+
+        if self.poll_parent and '/' in self.poll_parent:
+            errors.append(f"polling parent {self.poll_parent} must be directly under the cgroup root, "
+                          f"a partition root needs a partition root as parent")
+        if self.poll_parent == self.parent:
+            errors.append(f"polling parent and parent are both {self.parent}")
+
+        online = set()
+        for cpus in self.generator.topology.numa_nodes.values():
+            online.update(cpus)
+        for role, cpus in plan.items():
+            missing = sorted(set(cpus) - online)
+            if missing:
+                errors.append(f"{role} uses CPUs not present in the topology: {_format_cpulist_value(missing)}")
+
+        # Isolated partitions need CPUs exclusive to them
+        for role in self.isolated_roles:
+            if role not in plan:
+                continue
+            for other, cpus in plan.items():
+                if other == role:
+                    continue
+                overlap = sorted(set(plan[role]) & set(cpus))
+                if overlap:
+                    errors.append(f"isolated {role} overlaps {other} on CPUs {_format_cpulist_value(overlap)}")
+
+        # Everything outside the partitions (docker, system services) runs on what is left
+        if online and not online - set(self._isolated_cpus(plan)):
+            errors.append("isolated partitions would leave the root cgroup without CPUs")
+
+        self.attach_pids = {}
+        for role, target in self.attach:
+            if role not in plan and self._cgroup_role(role) not in plan:
+                errors.append(f"--cgroup-attach {role}={target}: no such role cgroup in the plan")
+                continue
+            try:
+                self.attach_pids[self._cgroup_role(role)] = self._target_pids(target)
+            except (OSError, ValueError, subprocess.CalledProcessError) as e:
+                errors.append(f"--cgroup-attach {role}={target}: {e}")
+
+        return errors
+
+    def describe(self, plan):
+        """Print the writes apply() would perform"""
+        member_plan = {r: c for r, c in plan.items() if r not in self.isolated_roles}
+        poll_plan = {r: c for r, c in plan.items() if r in self.isolated_roles}
+
+        parent_path = os.path.join(self.cgroup_root, self.parent)
+        print(f"cgroup parent: {parent_path}")
+        print(f"  cpuset.cpus = {_format_cpulist_value(self._union(member_plan))}")
+        print(f"  cpuset.mems = {_format_cpulist_value(self._all_mems())}")
+        for role, cpus in member_plan.items():
+            self._describe_role(role, cpus)
+
+        if poll_plan:
+            poll_path = os.path.join(self.cgroup_root, self.poll_parent)
+            print(f"cgroup polling parent: {poll_path}")
+            print(f"  cpuset.cpus = {_format_cpulist_value(self._union(poll_plan))}")
+            print(f"  cpuset.mems = {_format_cpulist_value(self._all_mems())}")
+            print("  cpuset.cpus.partition = root")
+            for role, cpus in poll_plan.items():
+                self._describe_role(role, cpus)
+
+        for role, pids in self.attach_pids.items():
+            print(f"attach PIDs {' '.join(map(str, pids))} -> {self._role_path(role)}/cgroup.procs")
+        if not self.attach_pids:
+            print("No processes are attached, see --cgroup-attach")
+
+    def _describe_role(self, role, cpus):
+        name = self._cgroup_name(role)
+        print(f"  {name}/cpuset.cpus = {_format_cpulist_value(cpus)}")
+        if role in self.generator.memory_bindings:
+            print(f"  {name}/cpuset.mems = {self.generator.memory_bindings[role]['cpuset_mems']}")
+        if role in self.isolated_roles:
+            print(f"  {name}/cpuset.cpus.partition = isolated")
+        for node in self._node_bindings(role):
+            print(f"  {name}/node{node['numa_node']}/cgroup.type = threaded")
+            print(f"  {name}/node{node['numa_node']}/cpuset.cpus = {node['cpus']}")
+            print(f"  {name}/node{node['numa_node']}/cpuset.mems = {node['numa_node']}")
+
+    def apply(self) -> bool:
+        """Validate and apply the plan, rolling back on any error"""
+        plan = self.build_plan()
+        errors = self.validate(plan)
+        if errors:
+            for error in errors:
+                print(f"Error: {error}")
+            print("cgroup plan rejected, nothing was changed")
+            return False
+
+        self.journal = []
+        try:
+            self._apply_plan(plan)
+        except (OSError, ValueError) as e:
+            print(f"Error applying cgroup cpusets: {e}")
+            self.rollback()
+            return False
+
+        print(f"Applied {len(plan)} role cpusets under {os.path.join(self.cgroup_root, self.parent)}"
+              + (f" and {os.path.join(self.cgroup_root, self.poll_parent)}" if self.isolated_roles else ""))
+        if self.attach_pids:
+            print(f"Attached {sum(len(p) for p in self.attach_pids.values())} processes")
+        return True
+
+    def _apply_plan(self, plan):
+        member_plan = {r: c for r, c in plan.items() if r not in self.isolated_roles}
+        poll_plan = {r: c for r, c in plan.items() if r in self.isolated_roles}
+        parent_path = os.path.join(self.cgroup_root, self.parent)
+
+        # Enable cpuset down to the parent slice
+        path = self.cgroup_root
+        for name in self.parent.split('/'):
+            self._enable_cpuset(path)
+            path = os.path.join(path, name)
+            self._mkdir(path)
+
+        # Demote existing partitions so the layout can change freely
+        for role in plan:
+            self._demote(self._role_path(role))
+        self._demote(parent_path)
+
+        self._apply_children(parent_path, member_plan)
+
+        if poll_plan:
+            poll_path = os.path.join(self.cgroup_root, self.poll_parent)
+            self._enable_cpuset(self.cgroup_root)
+            self._mkdir(poll_path)
+            self._apply_children(poll_path, poll_plan, partition='root')
+
+        for role, pids in self.attach_pids.items():
+            procs = os.path.join(self._role_path(role), 'cgroup.procs')
+            for pid in pids:
+                previous = self._proc_cgroup(pid)
+                # Journal the cgroup the process comes from so rollback can move it back
+                self.journal.append(('attach', os.path.join(self.cgroup_root, previous.lstrip('/'), 'cgroup.procs'),
+                                     str(pid)))
+                if not os.path.exists(procs):
+                    self.journal.append(('write', procs, None))  # only possible on a fake cgroupfs
+                with open(procs, 'w') as f:
+                    f.write(str(pid))
+
+    def _apply_children(self, parent_path, plan, partition=None):
+        """Write a parent cgroup and one child per role of the plan"""
+        all_cpus = self._union(plan)
+
+        # Widen the parent first so children never exceed it while moving
+        current = self._read(os.path.join(parent_path, 'cpuset.cpus'))
+        old_cpus = self.generator.topology._parse_cpu_list(current) if current else []
+        self._write(os.path.join(parent_path, 'cpuset.cpus'),
+                    _format_cpulist_value(sorted(set(all_cpus) | set(old_cpus))))
+        self._write(os.path.join(parent_path, 'cpuset.mems'), _format_cpulist_value(self._all_mems()))
+        if partition:
+            self._write(os.path.join(parent_path, 'cpuset.cpus.partition'), partition)
+        self._enable_cpuset(parent_path)
+
+        for role, cpus in plan.items():
+            child = os.path.join(parent_path, self._cgroup_name(role))
+            self._mkdir(child)
+            self._write(os.path.join(child, 'cpuset.cpus'), _format_cpulist_value(cpus))
+            if role in self.generator.memory_bindings:
+                self._write(os.path.join(child, 'cpuset.mems'),
+                            self.generator.memory_bindings[role]['cpuset_mems'])
+            if role in self.isolated_roles:
+                self._write(os.path.join(child, 'cpuset.cpus.partition'), 'isolated')
+
+            # Per-device pollers on several nodes get one child per node bound
+            # to its local memory. The children are threaded so single poller
+            # threads of a process in the role cgroup can be moved there.
+            node_bindings = self._node_bindings(role)
+            if node_bindings:
+                self._enable_cpuset(child)
+            for node in node_bindings:
+                node_path = os.path.join(child, f"node{node['numa_node']}")
+                self._mkdir(node_path)
+                if self._read(os.path.join(node_path, 'cgroup.type')) != 'threaded':
+                    self._write(os.path.join(node_path, 'cgroup.type'), 'threaded')
+                self._write(os.path.join(node_path, 'cpuset.cpus'), node['cpus'])
+                self._write(os.path.join(node_path, 'cpuset.mems'), str(node['numa_node']))
+
+        self._write(os.path.join(parent_path, 'cpuset.cpus'), _format_cpulist_value(all_cpus))
+
+    def rollback(self):
+        """Undo journaled changes in reverse order"""
+        print(f"Rolling back {len(self.journal)} cgroup changes...")
+        created = set(path for action, path, _ in self.journal if action == 'mkdir')
+        for action, path, previous in reversed(self.journal):
+            try:
+                if action == 'mkdir':
+                    os.rmdir(path)
+                elif action == 'attach':
+                    # Move the process back to the cgroup it came from
+                    with open(path, 'w') as f:
+                        f.write(previous)
+                elif previous is None:
+                    os.remove(path)  # only possible on a fake cgroupfs
+                elif path.endswith('cgroup.type') and os.path.dirname(path) in created:
+                    # A threaded cgroup cannot become a domain again, it is removed below
+                    continue
+                elif path.endswith('cgroup.subtree_control'):
+                    # Controllers are toggled, not overwritten; a fake cgroupfs
+                    # just gets the old contents back
+                    with open(path, 'w') as f:
+                        f.write('-cpuset')
+                    if self._read(path) != previous:
+                        with open(path, 'w') as f:
+                            f.write(previous)
+                else:
+                    with open(path, 'w') as f:
+                        f.write(previous)
+            except OSError as e:
+                print(f"Warning: could not roll back {path}: {e}")
+        self.journal = []
+
+    def _target_pids(self, target):
+        """PIDs of a --cgroup-attach target: a PID, or every process of a docker container"""
+        if target.isdigit():
+            return [int(target)]
+        pid = int(subprocess.check_output(['docker', 'inspect', '-f', '{{.State.Pid}}', target],
+                                          text=True, stderr=subprocess.DEVNULL).strip())
+        if pid == 0:
+            raise ValueError(f"container {target} is not running")
+        procs = self._read(os.path.join(self.cgroup_root, self._proc_cgroup(pid).lstrip('/'), 'cgroup.procs'))
+        return [int(p) for p in procs.split()] if procs else [pid]
+
+    def _proc_cgroup(self, pid):
+        """cgroup v2 path of a process, relative to the cgroup root"""
+        with open(os.path.join(self.proc_root, str(pid), 'cgroup'), 'r') as f:
+            for line in f:
+                if line.startswith('0::'):
+                    return line[3:].strip()
+        raise ValueError(f"process {pid} is not in a cgroup v2 hierarchy")
+
+    def _cgroup_role(self, name):
+        """Role for a --cgroup-attach name, accepts etcd as well as etcd_cpuset"""
+        return name if name.endswith('_cpuset') else f"{name}_cpuset"
+
+    def _role_path(self, role):
+        parent = self.poll_parent if role in self.isolated_roles else self.parent
+        return os.path.join(self.cgroup_root, parent, self._cgroup_name(role))
+
+    def _isolated_cpus(self, plan):
+        return self._union({r: c for r, c in plan.items() if r in self.isolated_roles})
+
+    def _union(self, plan):
+        return sorted(set(c for cpus in plan.values() for c in cpus))
+
+    def _demote(self, path):
+        current = self._read(os.path.join(path, 'cpuset.cpus.partition'))
+        if current and current.split()[0] != 'member':
+            self._write(os.path.join(path, 'cpuset.cpus.partition'), 'member')
+
+    def _node_bindings(self, role):
+        binding = self.generator.memory_bindings.get(role)
+        return binding['node_bindings'] if binding else []
+
+    def _all_mems(self):
+        return sorted(numa_id for numa_id, cpus in self.generator.topology.numa_nodes.items() if cpus)
+
+    def _cgroup_name(self, role):
+        return role[:-len('_cpuset')] if role.endswith('_cpuset') else role
+
+    def _enable_cpuset(self, path):
+        control = os.path.join(path, 'cgroup.subtree_control')
+        current = self._read(control)
+        if current is None or 'cpuset' not in current.split():
+            self._write(control, '+cpuset')
+
+    def _mkdir(self, path):
+        if not os.path.isdir(path):
+            os.mkdir(path)
+            self.journal.append(('mkdir', path, None))
+
+    def _read(self, path):
+        try:
+            with open(path, 'r') as f:
+                return f.read().strip()
+        except OSError:
+            return None
+
+    def _write(self, path, value):
+        previous = self._read(path)
+        # Journal before writing so a partially applied write is undone too
+        self.journal.append(('write', path, previous))
+        with open(path, 'w') as f:
+            f.write(str(value))
+        if path.endswith('cpuset.cpus.partition'):
+            # The kernel accepts invalid partitions and reports them on read back
+            state = self._read(path) or ''
+            if 'invalid' in state:
+                raise ValueError(f"{path}: {state}")
+
+
+class ClientPinningProfile:
+    """Pins S3 load generators (warp, aws cli) on client nodes next to the HSE NIC
+
+    The first thread pair of every NUMA node is kept for housekeeping, the NIC
+    local nodes give a few pairs per adapter to NIC IRQs and the rest to the
+    load-generator workers. Cores on the other nodes stay spare.
+    """
+
+    def __init__(self, topology: SystemTopology, irq_pairs_per_nic: int = 2,
+                 ops_per_worker: int = 2, nic_numa_nodes: List[int] = None,
+                 allocation_mode: str = None):
+        self.topology = topology
+        self.allocation_mode = allocation_mode or topology.allocation_mode()
+        self.irq_pairs_per_nic = irq_pairs_per_nic
+        self.ops_per_worker = ops_per_worker
+        self.nic_numa_nodes = nic_numa_nodes
+
+        self.worker_cpuset = []
+        self.irq_cpuset = []
+        self.housekeeping_cpuset = []
+        self.spare_cpuset = []
+        self.concurrency = 0
+
+    def generate(self):
+        """Split the client CPUs into housekeeping, IRQ, worker and spare sets"""
+        adapters_by_numa = defaultdict(int)
+        for adapter in self.topology.mellanox_adapters:
+            adapters_by_numa[adapter['numa_node']] += 1
+
+        if not self.nic_numa_nodes:
+            self.nic_numa_nodes = sorted(n for n in adapters_by_numa if n in self.topology.numa_nodes)
+        if not self.nic_numa_nodes:
+            print("Warning: No NIC NUMA node found, spreading workers over all NUMA nodes")
+            self.nic_numa_nodes = sorted(self.topology.numa_nodes)
+
+        for numa_id in sorted(self.topology.numa_nodes):
+            pairs = self.topology.thread_pairs(numa_id, self.allocation_mode)
+            if not pairs:
+                continue
+
+            self.housekeeping_cpuset.extend(pairs[0])
+            if numa_id not in self.nic_numa_nodes:
+                for pair in pairs[1:]:
+                    self.spare_cpuset.extend(pair)
+                continue
+
+            irq_pairs = self.irq_pairs_per_nic * max(adapters_by_numa.get(numa_id, 0), 1)
+            for pair in pairs[1:1 + irq_pairs]:
+                self.irq_cpuset.extend(pair)
+            for pair in pairs[1 + irq_pairs:]:
+                self.worker_cpuset.extend(pair)
+
+        self.worker_cpuset.sort()
+        self.irq_cpuset.sort()
+        self.housekeeping_cpuset.sort()
+        self.spare_cpuset.sort()
+
+        if not self.worker_cpuset:
+            print("Warning: No CPUs left for load-generator workers on the NIC NUMA nodes")
+        self.concurrency = len(self.worker_cpuset) * self.ops_per_worker
+
+    def prefixes(self):
+        """Command prefixes that pin a load generator to the worker CPUs"""
+        workers = _format_cpulist_value(self.worker_cpuset)
+        mems = _format_cpulist_value(self.nic_numa_nodes)
+        return {
+            'taskset': f"taskset -c {workers}",
+            'numactl': f"numactl --physcpubind={workers} --membind={mems}"
+        }
+
+    def as_dict(self):
+        return {
+            'profile': 'client',
+            'allocation_mode': self.allocation_mode,
+            'nic_numa_nodes': self.nic_numa_nodes,
+            'worker_cpuset': _format_cpulist_value(self.worker_cpuset),
+            'irq_cpuset': _format_cpulist_value(self.irq_cpuset),
+            'housekeeping_cpuset': _format_cpulist_value(self.housekeeping_cpuset),
+            'spare_cpuset': _format_cpulist_value(self.spare_cpuset),
+            'worker_threads': len(self.worker_cpuset),
+            'recommended_concurrency': self.concurrency,
+            'prefixes': self.prefixes(),
+            'irqbalance_banned_cpulist': _format_cpulist_value(sorted(self.worker_cpuset + self.housekeeping_cpuset))
+        }
+
+    def print_results(self, file=sys.stdout):
+        """Print the client pinning profile"""
+        result = self.as_dict()
+        print("\n=== CLIENT PINNING PROFILE ===", file=file)
+        print(f"NIC NUMA nodes: {_format_cpulist_value(self.nic_numa_nodes)}", file=file)
+        print(f"worker_cpuset: {result['worker_cpuset']}", file=file)
+        print(f"irq_cpuset: {result['irq_cpuset']}", file=file)
+        print(f"housekeeping_cpuset: {result['housekeeping_cpuset']}", file=file)
+        print(f"spare_cpuset: {result['spare_cpuset']}", file=file)
+        print(f"Worker threads: {result['worker_threads']}, recommended concurrency: {self.concurrency}", file=file)
+
+        print("\n=== USAGE ===", file=file)
+        print(f"{result['prefixes']['numactl']} warp client", file=file)
+        print(f"{result['prefixes']['taskset']} aws --endpoint-url=$S3URL_HSE s3 ls", file=file)
+        print(f"warp <benchmark> --concurrent {self.concurrency} ...", file=file)
+        print(f"# Keep NIC IRQs off the workers: IRQBALANCE_BANNED_CPULIST={result['irqbalance_banned_cpulist']}", file=file)
+        print(f"# or pin them: echo {result['irq_cpuset']} > /proc/irq/<irq>/smp_affinity_list", file=file)
+
+
+# Mock layouts: (sockets, NUMA nodes per socket, cores per node, CPU-less nodes per socket,
+#                threads per core, cores per L2)
+MOCK_LAYOUTS = {
+    'nps1': (2, 1, 64, 0, 2, 1),    # AMD, one node per socket
+    'nps2': (2, 2, 32, 0, 2, 1),
+    'nps4': (2, 4, 16, 0, 2, 1),
+    'snc2': (2, 2, 16, 0, 2, 1),    # Intel sub-NUMA clustering
+    'snc4': (2, 4, 8, 0, 2, 1),
+    'cxl': (2, 1, 32, 1, 2, 1),     # one CXL memory expander per socket
+    'smtoff': (2, 1, 32, 0, 1, 1),  # x86 with SMT disabled
+    'arm64': (2, 1, 80, 0, 1, 2),   # Arm server, one thread per core, L2 per 2-core cluster
+    'prefcore': (2, 1, 32, 0, 2, 1),  # CPPC preferred core ranking, powersave governor
+}
+
+
+def build_mock_topology(topology, layout='default'):
+    """Fill a SystemTopology with mock data for testing"""
+    if layout == 'default':
+        topology.total_cores = 64
+        topology.total_threads = 128
+        topology.numa_nodes = {
+            0: list(range(0, 16)) + list(range(64, 80)),
+            1: list(range(16, 32)) + list(range(80, 96)),
+            2: list(range(32, 48)) + list(range(96, 112)),
+            3: list(range(48, 64)) + list(range(112, 128))
+        }
+        # Mock NVMe devices
+        for i in range(12):
+            topology.nvme_devices.append({
+                'name': f'nvme{i}',
+                'pci': f'00:1{i:02x}.0',
+                'numa_node': i % 4
+            })
+        # Mock Mellanox adapters
+        for i in range(2):
+            topology.mellanox_adapters.append({
+                'pci': f'00:2{i:02x}.0',
+                'numa_node': i % 2
+            })
+        return
+    
+    (sockets, nodes_per_socket, cores_per_node, memory_nodes_per_socket,
+     threads_per_core, cores_per_l2) = MOCK_LAYOUTS[layout]
+    cpu_nodes = sockets * nodes_per_socket
+    topology.total_cores = cpu_nodes * cores_per_node
+    topology.threads_per_core = threads_per_core
+    topology.total_threads = topology.total_cores * threads_per_core
+    
+    # Linux numbering: first threads of all cores, then their SMT siblings
+    for numa_id in range(cpu_nodes):
+        first = numa_id * cores_per_node
+        topology.numa_nodes[numa_id] = list(range(first, first + cores_per_node))
+        if threads_per_core == 2:
+            topology.numa_nodes[numa_id] += list(range(topology.total_cores + first,
+                                                       topology.total_cores + first + cores_per_node))
+        topology.node_sockets[numa_id] = numa_id // nodes_per_socket
+        
+        # One last level cache per node
+        for cpu in topology.numa_nodes[numa_id]:
+            core = cpu % topology.total_cores
+            topology.cache_domains[cpu] = (first, core - (core - first) % cores_per_l2)
+    
+    if layout == 'prefcore':
+        # CPPC highest_perf between 196 and 255, both threads of a core share it
+        for cpus in topology.numa_nodes.values():
+            for cpu in cpus:
+                core = cpu % topology.total_cores
+                topology.core_ranking[cpu] = 196 + (core * 37) % 60
+                topology.cpufreq[cpu] = {'governor': 'powersave', 'epp': 'balance_performance'}
+        topology.core_ranking_source = 'acpi_cppc/highest_perf'
+        topology.itmt_enabled = True
+    
+    # CPU-less nodes are numbered after the CPU nodes
+    node_socket = dict(topology.node_sockets)
+    for i in range(sockets * memory_nodes_per_socket):
+        numa_id = cpu_nodes + i
+        topology.memory_only_nodes.append(numa_id)
+        node_socket[numa_id] = i // memory_nodes_per_socket
+    
+    # SLIT style distances: 10 local, 12 same socket, 20 CXL on the socket, 32 remote
+    for numa_id, socket in node_socket.items():
+        topology.numa_distances[numa_id] = {}
+        for other, other_socket in node_socket.items():
+            if other == numa_id:
+                distance = 10
+            elif other_socket != socket:
+                distance = 32
+            elif numa_id in topology.memory_only_nodes or other in topology.memory_only_nodes:
+                distance = 20
+            else:
+                distance = 12
+            topology.numa_distances[numa_id][other] = distance
+    
+    # 12 NVMe devices spread over the CPU nodes, the last two behind the CXL nodes if any
+    for i in range(12):
+        numa_id = i % cpu_nodes
+        if topology.memory_only_nodes and i >= 10:
+            numa_id = topology.memory_only_nodes[i % len(topology.memory_only_nodes)]
+        topology.nvme_devices.append({
+            'name': f'nvme{i}',
+            'pci': f'00:1{i:02x}.0',
+            'numa_node': numa_id
+        })
+    # One Mellanox adapter on the first node of each socket
+    for socket in range(sockets):
+        topology.mellanox_adapters.append({
+            'pci': f'0000:{0x20 + socket:02x}:00.0',
+            'numa_node': socket * nodes_per_socket
+        })
+    
+    topology.resolve_device_numa()
+
+
 def main():
     parser = argparse.ArgumentParser(
         description='Generate core masks for high-performance storage systems'
@@ -766,14 +2060,104 @@ def main():
         default='None',
         help='Additional comments about the hardware'
     )
+    parser.add_argument(
+        '--profile',
+        choices=['server', 'client'],
+        default='server',
+        help='server: storage node core masks, client: S3 load generator pinning (default: server)'
+    )
+    parser.add_argument(
+        '--client-netdev',
+        type=str,
+        default='ens300np0',
+        help='HSE network interface used to find the NIC NUMA node on clients (default: ens300np0)'
+    )
+    parser.add_argument(
+        '--irq-pairs-per-nic',
+        type=int,
+        default=2,
+        help='Thread pairs per adapter kept for NIC IRQs on clients (default: 2)'
+    )
+    parser.add_argument(
+        '--ops-per-worker',
+        type=int,
+        default=2,
+        help='Concurrent operations per worker thread for the recommended concurrency (default: 2)'
+    )
+    parser.add_argument(
+        '--policy',
+        type=str,
+        help='Role policy YAML file (default: built-in policy, see --dump-policy)'
+    )
+    parser.add_argument(
+        '--dump-policy',
+        action='store_true',
+        help='Print the built-in role policy and exit'
+    )
+    parser.add_argument(
+        '--apply-cgroup',
+        action='store_true',
+        help='Write the role cpusets into cgroup v2 (isolated partitions for polling roles)'
+    )
+    parser.add_argument(
+        '--cgroup-attach',
+        action='append',
+        metavar='ROLE=CONTAINER|PID',
+        help='Move all processes of a docker container (or one PID) into a role cgroup with --apply-cgroup, '
+             'e.g. etcd=etcd (repeatable, undone on rollback)'
+    )
+    parser.add_argument(
+        '--cgroup-root',
+        type=str,
+        default='/sys/fs/cgroup',
+        help='cgroup v2 mount point, point at a fake tree for testing (default: /sys/fs/cgroup)'
+    )
+    parser.add_argument(
+        '--cgroup-parent',
+        type=str,
+        default='red.slice',
+        help='Parent cgroup for the role cgroups (default: red.slice)'
+    )
+    parser.add_argument(
+        '--cgroup-poll-parent',
+        type=str,
+        default='red-poll.slice',
+        help='Partition root below the cgroup root for the isolated polling roles, '
+             'none to keep them as plain member cgroups (default: red-poll.slice)'
+    )
+    parser.add_argument(
+        '--no-preferred-cores',
+        action='store_true',
+        help='Ignore the CPPC/cpufreq preferred core ranking and allocate the lowest numbered cores first'
+    )
     parser.add_argument(
         '--use-mock-data',
         action='store_true',
         help='Use mock data for testing (useful on non-Linux systems)'
     )
+    parser.add_argument(
+        '--mock-layout',
+        choices=['default'] + sorted(MOCK_LAYOUTS),
+        default='default',
+        help='NUMA layout of the mock data: NPS1/2/4, SNC2/4, CXL memory nodes, SMT off, arm64 '
+             'or preferred core ranking (default: default)'
+    )
+    parser.add_argument(
+        '--allocation-mode',
+        choices=['auto', 'smt', 'core'],
+        default='auto',
+        help='smt: pair the threads of a core, core: pair neighbouring cores when there is one thread per core, '
+             'auto: select from the detected threads per core (default: auto)'
+    )
     
     args = parser.parse_args()
     
+    if args.dump_policy:
+        print(DEFAULT_ROLE_POLICY, end='')
+        return
+    
+    policy = RolePolicy.load(args.policy)
+    
     # Check if running as root (might be needed for some /sys access)
     if not args.dry_run and os.geteuid() != 0:
         print("Warning: Running without root privileges. Some information may be unavailable.")
@@ -784,31 +2168,13 @@ def main():
 
     if args.use_mock_data:
         print("Using mock data for demonstration...")
-        # Create mock topology for testing
-        topology.total_cores = 64
-        topology.total_threads = 128
-        topology.numa_nodes = {
-            0: list(range(0, 16)) + list(range(64, 80)),
-            1: list(range(16, 32)) + list(range(80, 96)),
-            2: list(range(32, 48)) + list(range(96, 112)),
-            3: list(range(48, 64)) + list(range(112, 128))
-        }
-        # Mock NVMe devices
-        for i in range(12):
-            topology.nvme_devices.append({
-                'name': f'nvme{i}',
-                'pci': f'00:1{i:02x}.0',
-                'numa_node': i % 4
-            })
-        # Mock Mellanox adapters
-        for i in range(2):
-            topology.mellanox_adapters.append({
-                'pci': f'00:2{i:02x}.0',
-                'numa_node': i % 2
-            })
+        build_mock_topology(topology, args.mock_layout)
     else:
         try:
             topology.parse_lscpu()
+            topology.parse_numa_sysfs()
+            topology.parse_cache_sysfs()
+            topology.parse_core_ranking_sysfs()
             topology.parse_lstopo()
         except (subprocess.CalledProcessError, FileNotFoundError) as e:
             print(f"Error: Could not parse system topology ({e})")
@@ -816,6 +2182,31 @@ def main():
             print("For testing purposes, you can use the --use-mock-data flag.")
             sys.exit(1)
     
+    allocation_mode = None if args.allocation_mode == 'auto' else args.allocation_mode
+    
+    if args.profile == 'client':
+        nic_numa = topology.netdev_numa_node(args.client_netdev) if not args.use_mock_data else None
+        if nic_numa is not None:
+            nic_numa = topology.nearest_cpu_node(nic_numa)
+        profile = ClientPinningProfile(topology, args.irq_pairs_per_nic, args.ops_per_worker,
+                                       [nic_numa] if nic_numa is not None else None, allocation_mode)
+        profile.generate()
+        
+        if args.format == 'text':
+            output = open(args.output, 'w') if args.output else sys.stdout
+            profile.print_results(file=output)
+        elif args.format == 'yaml':
+            output = open(args.output, 'w') if args.output else sys.stdout
+            yaml.dump(profile.as_dict(), output, default_flow_style=False, sort_keys=False)
+        else:
+            output = open(args.output, 'w') if args.output else sys.stdout
+            json.dump(profile.as_dict(), output, indent=2)
+            print(file=output)
+        if args.output:
+            output.close()
+            print(f"Client profile exported to {args.output} in {args.format.upper()} format")
+        return
+    
     # Check minimum requirements
     if topology.total_cores < 32:
         print(f"Error: System has only {topology.total_cores} cores. Minimum 32 cores required.")
@@ -823,13 +2214,29 @@ def main():
     
     # Generate core masks
     print("Generating core masks...")
-    generator = CoreMaskGenerator(topology, args.max_pairs)
+    generator = CoreMaskGenerator(topology, args.max_pairs, policy, allocation_mode,
+                                  not args.no_preferred_cores)
     generator.generate_masks()
     
     # Display results in text format if requested or no output format specified
     if args.format == 'text' or (not args.output and not args.export_json and args.format == 'text'):
         generator.print_results()
     
+    # Apply to cgroup v2 if requested
+    if args.apply_cgroup:
+        applier = CgroupCpusetApplier(generator, args.cgroup_root, args.cgroup_parent,
+                                      args.cgroup_poll_parent, args.cgroup_attach)
+        if args.dry_run:
+            plan = applier.build_plan()
+            errors = applier.validate(plan)
+            for error in errors:
+                print(f"Error: {error}")
+            applier.describe(plan)
+            if errors:
+                sys.exit(1)
+        elif not applier.apply():
+            sys.exit(1)
+
     # Export if requested
     if args.export_json:
         generator.export_json(args.export_json)
@@ -862,5 +2269,4 @@ def main():
 
 
 if __name__ == "__main__":
-    import os
     main()
@@ -0,0 +1,389 @@
+#!/usr/bin/env python3
+# pylint: skip-file
+"""
+CPU Role Monitor Tool
+Samples /proc/stat per CPU and aggregates busy/softirq/iowait per cpuset role
+and per NUMA node, using the role->CPU map produced by red-core-mask-generator.py
+"""
+
+import json
+import re
+import sys
+import time
+import argparse
+from collections import defaultdict, deque
+
+import yaml
+
+
+# Defaults for hwconfig input, the --export-json file records both for its policy
+# Sets derived from other roles; monitoring them would double count CPUs
+DERIVED_ROLES = {'handler_cpuset', 'nvmf_cpuset', 'reds3_sibling_cpuset'}
+
+# Roles that share the others_cpuset housekeeping cores
+HOUSEKEEPING_ROLES = ['others_cpuset', 'posix_cpuset', 'auxiliary_cpuset',
+                      'spdk_main_cpuset', 'etcd_cpuset']
+
+# /proc/stat cpu line fields, guest time is already accounted in user/nice
+STAT_FIELDS = ['user', 'nice', 'system', 'idle', 'iowait', 'irq', 'softirq', 'steal']
+
+SNAPSHOT_MARKER = '### '
+
+
+def parse_cpu_list(cpu_str):
+    """Parse CPU list string like '0-15,128-143' into list of integers"""
+    cpus = []
+    for part in str(cpu_str).split(','):
+        part = part.strip()
+        if not part:
+            continue
+        if '-' in part:
+            start, end = map(int, part.split('-'))
+            cpus.extend(range(start, end + 1))
+        else:
+            cpus.append(int(part))
+    return sorted(cpus)
+
+
+def load_role_map(path):
+    """Load role->CPUs and NUMA->CPUs from a generator output file
+
+    Accepts the --export-json file as well as the hwconfig YAML/JSON output.
+    Returns (roles, numa_nodes, housekeeping roles).
+    """
+    with open(path, 'r') as f:
+        data = yaml.safe_load(f)
+
+    roles = {}
+    numa_nodes = {}
+    housekeeping_roles = HOUSEKEEPING_ROLES
+
+    if 'cpu_sets' in data:
+        # --export-json format, role kinds follow the policy it was generated with
+        derived_roles = set(data.get('derived_roles', DERIVED_ROLES))
+        housekeeping_roles = data.get('housekeeping_roles', HOUSEKEEPING_ROLES)
+        for role, cpus in data['cpu_sets'].items():
+            if role not in derived_roles:
+                roles[role] = sorted(cpus)
+        for numa_id, cpus in data.get('topology', {}).get('numa_nodes', {}).items():
+            numa_nodes[int(numa_id)] = sorted(cpus)
+    else:
+        # hwconfig format
+        for section in ('etcd', 'reds3', 'redagent'):
+            resources = (data.get(section) or {}).get('resources', {})
+            for key, value in resources.items():
+                if not key.endswith('cpuset') or key in DERIVED_ROLES or not value:
+                    continue
+                role = 'etcd_cpuset' if section == 'etcd' else key
+                roles[role] = parse_cpu_list(value)
+        for entry in data.get('description', {}).get('node', {}).get('numa_cpu_list', []):
+            numa_nodes[int(entry['numa_node'])] = parse_cpu_list(entry['cpulist'])
+
+    if not roles:
+        print(f"Error: no cpuset roles found in {path}")
+        sys.exit(1)
+
+    return roles, numa_nodes, housekeeping_roles
+
+
+def parse_proc_stat(text):
+    """Parse per-CPU counters from /proc/stat contents"""
+    counters = {}
+    for line in text.splitlines():
+        match = re.match(r'cpu(\d+)\s+(.*)', line)
+        if match:
+            values = [int(v) for v in match.group(2).split()]
+            values += [0] * (len(STAT_FIELDS) - len(values))
+            counters[int(match.group(1))] = dict(zip(STAT_FIELDS, values))
+    return counters
+
+
+def read_proc_stat():
+    """Read the current /proc/stat contents"""
+    with open('/proc/stat', 'r') as f:
+        return f.read()
+
+
+def iter_replay_snapshots(path):
+    """Yield (timestamp, counters) from a captured /proc/stat file
+
+    Snapshots are either preceded by a '### <epoch>' marker line (as written
+    by --capture) or simply concatenated /proc/stat dumps, in which case each
+    aggregate 'cpu ' line starts a new snapshot.
+    """
+    timestamp = None
+    lines = []
+    index = 0
+
+    def flush():
+        nonlocal index
+        ts = timestamp if timestamp is not None else float(index)
+        index += 1
+        return ts, parse_proc_stat('\n'.join(lines))
+
+    with open(path, 'r') as f:
+        for line in f:
+            line = line.rstrip('\n')
+            if line.startswith(SNAPSHOT_MARKER) or line.startswith('cpu '):
+                if any(l.startswith('cpu') for l in lines):
+                    yield flush()
+                    if line.startswith('cpu '):
+                        timestamp = None
+                    lines = []
+                if line.startswith(SNAPSHOT_MARKER):
+                    timestamp = float(line[len(SNAPSHOT_MARKER):].strip())
+                    continue
+            lines.append(line)
+    if any(l.startswith('cpu') for l in lines):
+        yield flush()
+
+
+def iter_live_snapshots(interval, count, capture_file=None):
+    """Yield (timestamp, counters) sampled from /proc/stat"""
+    taken = 0
+    while count is None or taken < count:
+        timestamp = time.time()
+        text = read_proc_stat()
+        if capture_file:
+            capture_file.write(f"{SNAPSHOT_MARKER}{timestamp:.3f}\n{text}")
+            capture_file.flush()
+        yield timestamp, parse_proc_stat(text)
+        taken += 1
+        if count is None or taken < count:
+            time.sleep(interval)
+
+
+def cpu_deltas(prev, curr):
+    """Compute per-CPU counter deltas between two snapshots"""
+    deltas = {}
+    for cpu, counters in curr.items():
+        if cpu not in prev:
+            continue
+        deltas[cpu] = {k: max(counters[k] - prev[cpu][k], 0) for k in STAT_FIELDS}
+    return deltas
+
+
+def aggregate(deltas, cpus):
+    """Aggregate busy/softirq/iowait percentages over a set of CPUs"""
+    totals = defaultdict(int)
+    present = 0
+    for cpu in cpus:
+        if cpu in deltas:
+            present += 1
+            for key, value in deltas[cpu].items():
+                totals[key] += value
+    total = sum(totals.values())
+    if not total:
+        return {'cpus': present, 'busy': 0.0, 'softirq': 0.0, 'iowait': 0.0}
+    busy = total - totals['idle'] - totals['iowait']
+    return {
+        'cpus': present,
+        'busy': round(busy * 100.0 / total, 1),
+        'softirq': round(totals['softirq'] * 100.0 / total, 1),
+        'iowait': round(totals['iowait'] * 100.0 / total, 1)
+    }
+
+
+class RebalanceAdvisor:
+    """Derives rebalancing hints from utilization sustained over a window"""
+
+    def __init__(self, window, hot, cold, softirq, numa_spread, housekeeping_roles=HOUSEKEEPING_ROLES):
+        self.window = window
+        self.hot = hot
+        self.cold = cold
+        self.softirq = softirq
+        self.numa_spread = numa_spread
+        self.housekeeping_roles = housekeeping_roles
+        self.history = deque(maxlen=window)
+
+    def add(self, sample):
+        self.history.append(sample)
+
+    def _mean(self, group, name, metric):
+        values = [s[group][name][metric] for s in self.history if name in s[group]]
+        return sum(values) / len(values) if values else None
+
+    def hints(self):
+        """Return hints once the window is full, empty list otherwise"""
+        if len(self.history) < self.window:
+            return []
+
+        hints = []
+        net = self._mean('roles', 'net_cpuset', 'busy')
+        storage = [self._mean('roles', r, 'busy') for r in ('redfs_cpuset', 'reds3_cpuset')]
+        storage = [v for v in storage if v is not None]
+        storage = max(storage) if storage else None
+
+        if net is not None and storage is not None:
+            if net >= self.hot and storage <= self.cold:
+                hints.append(f"net_cpuset saturated ({net:.0f}% busy) while redfs/reds3 idle "
+                             f"({storage:.0f}%): raise the net_cpuset per_device ratio (pollers per "
+                             f"adapter) in the role policy (--dump-policy, --policy)")
+            elif storage >= self.hot and net <= self.cold:
+                hints.append(f"redfs/reds3 saturated ({storage:.0f}% busy) while net_cpuset idle "
+                             f"({net:.0f}%): raise --max-pairs or lower the net_cpuset per_device ratio "
+                             f"in the role policy")
+
+        for role in self.housekeeping_roles:
+            busy = self._mean('roles', role, 'busy')
+            if busy is None or busy < self.hot:
+                continue
+            if role == 'others_cpuset':
+                # Sized by what the housekeeping roles leave over, it has no count of its own
+                hints.append(f"{role} overloaded ({busy:.0f}% busy): lower the housekeeping role "
+                             f"counts in the role policy (--dump-policy, --policy)")
+            else:
+                hints.append(f"{role} overloaded ({busy:.0f}% busy): raise the {role} count "
+                             f"in the role policy (--dump-policy, --policy)")
+
+        for role in self.history[-1]['roles']:
+            if role == 'net_cpuset':
+                continue
+            softirq = self._mean('roles', role, 'softirq')
+            if softirq is not None and softirq >= self.softirq:
+                hints.append(f"{role} spends {softirq:.0f}% in softirq: steer NIC IRQs away "
+                             f"from it (irqbalance banned CPUs / smp_affinity)")
+
+        numa_busy = {n: self._mean('numa', n, 'busy') for n in self.history[-1]['numa']}
+        numa_busy = {n: v for n, v in numa_busy.items() if v is not None}
+        if len(numa_busy) > 1:
+            hottest = max(numa_busy, key=numa_busy.get)
+            coldest = min(numa_busy, key=numa_busy.get)
+            if numa_busy[hottest] - numa_busy[coldest] >= self.numa_spread:
+                hints.append(f"NUMA {hottest} at {numa_busy[hottest]:.0f}% vs NUMA {coldest} at "
+                             f"{numa_busy[coldest]:.0f}%: check device NUMA placement and pair balance")
+
+        # Report each sustained condition once per window
+        self.history.clear()
+        return hints
+
+
+def print_table(sample, clear, file=sys.stdout):
+    """Print one sample as a table"""
+    if clear:
+        file.write("\033[2J\033[H")
+    print(f"\n=== {time.strftime('%F %T', time.localtime(sample['timestamp']))} "
+          f"(interval {sample['interval']:.1f}s) ===", file=file)
+    print(f"{'role':<22} {'cpus':>5} {'busy%':>7} {'softirq%':>9} {'iowait%':>8}", file=file)
+    for role, stats in sample['roles'].items():
+        print(f"{role:<22} {stats['cpus']:>5} {stats['busy']:>7.1f} {stats['softirq']:>9.1f} "
+              f"{stats['iowait']:>8.1f}", file=file)
+    for numa_id, stats in sample['numa'].items():
+        print(f"{'NUMA ' + str(numa_id):<22} {stats['cpus']:>5} {stats['busy']:>7.1f} "
+              f"{stats['softirq']:>9.1f} {stats['iowait']:>8.1f}", file=file)
+    for hint in sample['hints']:
+        print(f"HINT: {hint}", file=file)
+    file.flush()
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Monitor per-role CPU utilization against generated cpusets'
+    )
+    parser.add_argument(
+        'role_map',
+        help='Generator output: --export-json file or hwconfig YAML/JSON'
+    )
+    parser.add_argument(
+        '--interval',
+        type=float,
+        default=1.0,
+        help='Sampling interval in seconds (default: 1.0)'
+    )
+    parser.add_argument(
+        '--count',
+        type=int,
+        help='Number of samples to take (default: run until interrupted)'
+    )
+    parser.add_argument(
+        '--format',
+        choices=['table', 'jsonl'],
+        default='table',
+        help='Output format (default: table)'
+    )
+    parser.add_argument(
+        '--replay',
+        type=str,
+        help='Replay captured /proc/stat snapshots from a file instead of sampling'
+    )
+    parser.add_argument(
+        '--capture',
+        type=str,
+        help='Also write the raw /proc/stat snapshots to a file for later --replay'
+    )
+    parser.add_argument(
+        '--window',
+        type=int,
+        default=10,
+        help='Samples an imbalance must persist before a hint is given (default: 10)'
+    )
+    parser.add_argument(
+        '--hot',
+        type=float,
+        default=85.0,
+        help='Busy percentage considered saturated (default: 85)'
+    )
+    parser.add_argument(
+        '--cold',
+        type=float,
+        default=30.0,
+        help='Busy percentage considered idle (default: 30)'
+    )
+    parser.add_argument(
+        '--softirq',
+        type=float,
+        default=30.0,
+        help='Softirq percentage on a non-net role reported as misplaced NIC IRQs (default: 30)'
+    )
+    parser.add_argument(
+        '--numa-spread',
+        type=float,
+        default=30.0,
+        help='Busy percentage gap between NUMA nodes reported as imbalance (default: 30)'
+    )
+
+    args = parser.parse_args()
+
+    roles, numa_nodes, housekeeping_roles = load_role_map(args.role_map)
+    advisor = RebalanceAdvisor(args.window, args.hot, args.cold, args.softirq, args.numa_spread,
+                               housekeeping_roles)
+
+    capture_file = None
+    if args.replay:
+        snapshots = iter_replay_snapshots(args.replay)
+    else:
+        if args.capture:
+            capture_file = open(args.capture, 'a')
+        # One extra snapshot as the baseline for the first delta
+        count = args.count + 1 if args.count is not None else None
+        snapshots = iter_live_snapshots(args.interval, count, capture_file)
+
+    clear = args.format == 'table' and not args.replay and sys.stdout.isatty()
+    prev_ts, prev = None, None
+    try:
+        for timestamp, counters in snapshots:
+            if prev is not None:
+                deltas = cpu_deltas(prev, counters)
+                sample = {
+                    'timestamp': timestamp,
+                    'interval': timestamp - prev_ts,
+                    'roles': {role: aggregate(deltas, cpus) for role, cpus in roles.items()},
+                    'numa': {numa_id: aggregate(deltas, cpus) for numa_id, cpus in sorted(numa_nodes.items())}
+                }
+                advisor.add(sample)
+                sample['hints'] = advisor.hints()
+
+                if args.format == 'jsonl':
+                    print(json.dumps(sample), flush=True)
+                else:
+                    print_table(sample, clear)
+            prev_ts, prev = timestamp, counters
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if capture_file:
+            capture_file.close()
+
+
+if __name__ == "__main__":
+    main()
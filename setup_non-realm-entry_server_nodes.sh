@@ -7,6 +7,13 @@ CTRL_PLANE_IP_SUBNET_MASK="24"
 SLEEPT=1
 
 # DO NOT EDIT BELOW, UNLESS NECESSARY
+# Per-step timing, see infinia_step_timing.sh; without it the steps just run
+if [ -f "$(dirname "$0")/infinia_step_timing.sh" ]; then
+	source "$(dirname "$0")/infinia_step_timing.sh"
+else
+	run_step () { shift 2; "$@"; }
+fi
+
 echo "Setting Infinia on the non-realm-entry-node: `hostname` at `date`"
 
 export BASE_PKG_URL="https://storage.googleapis.com/ddn-redsetup-public" &&
@@ -16,15 +23,15 @@ export REL_DIST_PATH="ubuntu/24.04" && \
 export REL_PKG_URL="${BASE_PKG_URL}/releases${RELEASE_TYPE}/${REL_DIST_PATH}" && \
 export RED_VER="2.1.30"
 
-wget $REL_PKG_URL/redsetup_"${RED_VER}"_"${TARGET_ARCH}${RELEASE_TYPE}".deb?cache-time="$(date +$s)" \
--O /tmp/redsetup.deb && sudo apt install -y /tmp/redsetup.deb
+run_step install download_redsetup wget $REL_PKG_URL/redsetup_"${RED_VER}"_"${TARGET_ARCH}${RELEASE_TYPE}".deb?cache-time="$(date +$s)" \
+-O /tmp/redsetup.deb && run_step install apt_install_redsetup sudo apt install -y /tmp/redsetup.deb
 
-sudo apt -y install /tmp/redsetup.deb
+run_step install apt_reinstall_redsetup sudo apt -y install /tmp/redsetup.deb
 sleep $SLEEPT
 
 echo "redsetup version"
 echo "---------------"
-redsetup -v
+run_step redsetup redsetup_version redsetup -v
 
 sleep $SLEEPT
 
@@ -32,5 +39,5 @@ sleep $SLEEPT
 if [ $(dpkg --print-architecture) == "amd64" ];
 then
 	echo "sudo redsetup --realm-entry-address $REALM_ENTRY_NODE_IP_ADDRESS --realm-entry-secret $REALM_ENTRY_SECRET --ctrl-plane-ip $(ip addr | grep inet | grep -v inet6 | grep $CTRL_PLANE_IP_SUBNET |awk '{print $2}' |sed 's/\/'"$CTRL_PLANE_IP_SUBNET_MASK"'//')"
-	sudo redsetup --realm-entry-address $REALM_ENTRY_NODE_IP_ADDRESS --realm-entry-secret $REALM_ENTRY_SECRET --ctrl-plane-ip $(ip addr | grep inet | grep -v inet6 | grep $CTRL_PLANE_IP_SUBNET |awk '{print $2}' |sed 's/\/'"$CTRL_PLANE_IP_SUBNET_MASK"'//')
+	run_step redsetup redsetup_join sudo redsetup --realm-entry-address $REALM_ENTRY_NODE_IP_ADDRESS --realm-entry-secret $REALM_ENTRY_SECRET --ctrl-plane-ip $(ip addr | grep inet | grep -v inet6 | grep $CTRL_PLANE_IP_SUBNET |awk '{print $2}' |sed 's/\/'"$CTRL_PLANE_IP_SUBNET_MASK"'//')
 fi
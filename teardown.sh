@@ -1,10 +1,17 @@
 #!/bin/bash
 SLEEPT=1
 
+# Per-step timing, see infinia_step_timing.sh; without it the steps just run
+if [ -f "$(dirname "$0")/infinia_step_timing.sh" ]; then
+	source "$(dirname "$0")/infinia_step_timing.sh"
+else
+	run_step () { shift 2; "$@"; }
+fi
+
 echo "Tearing down the Infinia setup: `date`"
-sudo rm -f /etc/red/deploy/config.lock
+run_step teardown remove_config_lock sudo rm -f /etc/red/deploy/config.lock
 sleep $SLEEPT
-sudo redsetup --reset
-sudo apt purge -y redsetup
-sudo apt purge -y hadoop-red red-client-common red-java-sdk redcli redtools
-docker system prune --all --force
+run_step teardown redsetup_reset sudo redsetup --reset
+run_step teardown purge_redsetup sudo apt purge -y redsetup
+run_step teardown purge_red_packages sudo apt purge -y hadoop-red red-client-common red-java-sdk redcli redtools
+run_step teardown docker_prune docker system prune --all --force
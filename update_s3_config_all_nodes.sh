@@ -11,6 +11,13 @@ SLEEPT=1
 # DO NOT EDIT BELOW, UNLESS NECESSARY
 CMD_OUTPUT_FILE=$BASE_CMD_OUTPUT_FILE"_`date +%F-%T`.txt"
 
+# Per-step timing, see infinia_step_timing.sh; without it the steps just run
+if [ -f "$(dirname "$0")/infinia_step_timing.sh" ]; then
+	source "$(dirname "$0")/infinia_step_timing.sh"
+else
+	run_step () { shift 2; "$@"; }
+fi
+
 get_user_input () {
         
         echo "Proceed to next step: Y/N"
@@ -21,17 +28,17 @@ get_user_input () {
 
 echo "Updating S3 config in node: `hostname` at: `date`" 2>&1 | tee -a $CMD_OUTPUT_FILE
 
-sudo cp ~/.bashrc $REPO_DIR/bashrc 2>&1 | tee -a $CMD_OUTPUT_FILE
-sudo chmod 0755 $REPO_DIR/bashrc 2>&1 | tee -a $CMD_OUTPUT_FILE
-pdsh -w $NON_REALM_AND_CLIENT_NODES "cp $REPO_DIR/bashrc $HOME_DIR/.bashrc" 2>&1 | tee -a $CMD_OUTPUT_FILE
-pdsh -w $ALL_NODES "ls -l $HOME_DIR/.bashrc" | dshbak -c 2>&1 | tee -a $CMD_OUTPUT_FILE
-pdsh -w $ALL_NODES "md5sum $HOME_DIR/.bashrc" | dshbak -c 2>&1 | tee -a $CMD_OUTPUT_FILE
+run_step s3_config bashrc_copy_repo sudo cp ~/.bashrc $REPO_DIR/bashrc
+run_step s3_config bashrc_chmod_repo sudo chmod 0755 $REPO_DIR/bashrc
+run_step s3_config bashrc_distribute pdsh -w $NON_REALM_AND_CLIENT_NODES "cp $REPO_DIR/bashrc $HOME_DIR/.bashrc"
+run_step s3_config bashrc_list bash -c "pdsh -w $ALL_NODES 'ls -l $HOME_DIR/.bashrc' | dshbak -c"
+run_step s3_config bashrc_verify bash -c "pdsh -w $ALL_NODES 'md5sum $HOME_DIR/.bashrc' | dshbak -c"
 sleep $SLEEPT
 #get_user_input
 
 echo "Cloning aws/credentials to rest of the nodes" 2>&1 | tee -a $CMD_OUTPUT_FILE
-cp ~/.aws/credentials $REPO_DIR/aws-credentials 2>&1 | tee -a $CMD_OUTPUT_FILE
-sudo chmod 0755 $REPO_DIR/aws-credentials 2>&1 | tee -a $CMD_OUTPUT_FILE
-pdsh -w $NON_REALM_AND_CLIENT_NODES "cp $REPO_DIR/aws-credentials $HOME_DIR/.aws/credentials" 2>&1 | tee -a $CMD_OUTPUT_FILE
-pdsh -w $ALL_NODES "ls -l $HOME_DIR/.aws/credentials" | dshbak -c 2>&1 | tee -a $CMD_OUTPUT_FILE
-pdsh -w $ALL_NODES "md5sum $HOME_DIR/.aws/credentials" | dshbak -c 2>&1 | tee -a $CMD_OUTPUT_FILE
+run_step s3_config credentials_copy_repo cp ~/.aws/credentials $REPO_DIR/aws-credentials
+run_step s3_config credentials_chmod_repo sudo chmod 0755 $REPO_DIR/aws-credentials
+run_step s3_config credentials_distribute pdsh -w $NON_REALM_AND_CLIENT_NODES "cp $REPO_DIR/aws-credentials $HOME_DIR/.aws/credentials"
+run_step s3_config credentials_list bash -c "pdsh -w $ALL_NODES 'ls -l $HOME_DIR/.aws/credentials' | dshbak -c"
+run_step s3_config credentials_verify bash -c "pdsh -w $ALL_NODES 'md5sum $HOME_DIR/.aws/credentials' | dshbak -c"